@@ -0,0 +1,333 @@
+import os, sys, gzip, json, time, hashlib, random, socket, asyncio, argparse, resource, contextlib, subprocess, multiprocessing
+from aiohttp import web
+
+import wp
+
+# Benchmark harness: serves a stand-in WordPress site from a separate process
+# and times every --checks item (and the full suite) against it, each in a
+# fresh interpreter so peak RSS is per case.
+
+CHECKS = ('wordpress', 'readme', 'debug-log', 'backup-file', 'directory-listing', 'listing-inventory', 'xml-rpc', 'robots-text',
+          'full-path-disclosure', 'enum-users', 'sitemap-forms', 'check-plugins', 'check-themes', 'core-version')
+
+class MockSite:
+    # Enough of a WordPress install for every check to do real work. Faults
+    # are injected per request: a sleep of latency + jitter, then a 5xx or a
+    # 429 with the configured rates.
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=0, soft_404=False,
+                 sitemap_urls=1000, sitemap_chunk=500, body_size=1 << 20, users=30, users_api=True, plugins=20, etags=False, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.soft_404 = soft_404
+        self.sitemap_urls = sitemap_urls
+        self.sitemap_chunk = sitemap_chunk
+        self.body_size = body_size
+        self.users = users
+        self.users_api = users_api
+        self.etags = etags
+        self.plugins = [line.split('#')[0].split()[0] for line in open(os.path.join(wp.DATA_DIR, 'plugins.txt'))
+                        if line.strip() and not line.startswith('#')][:plugins]
+        self.random = random.Random(seed)
+        assets = ''.join(f'<script src="/wp-content/plugins/{plugin.split("/")[0]}/main.js?ver=1.{i}"></script>'
+                         for i, plugin in enumerate(self.plugins[:plugins // 2]))
+        self.home = ('<html><head><meta name="generator" content="WordPress 6.4.2">'
+                     '<link rel="stylesheet" href="/wp-content/themes/astra/style.css?ver=4.1">'
+                     '<link rel="stylesheet" href="/wp-includes/css/dist/block-library/style.min.css?ver=6.4.2">'
+                     f'{assets}<link rel="https://api.w.org/" href="/wp-json/"><link rel="pingback" href="/xmlrpc.php">'
+                     '</head><body><form><input type="text" name="s"></form>' + 'lorem ipsum ' * 2000 + '</body></html>').encode()
+        self.log = b''.join(b'[01-Jan-2024 10:00:00 UTC] PHP Notice: Undefined index in /var/www/html/wp-content/plugins/x/x.php on line %d\n' % i
+                            for i in range(self.body_size // 100 + 1))[:self.body_size]
+
+    def app(self):
+        app = web.Application(middlewares=[self.faults])
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        return app
+
+    @web.middleware
+    async def faults(self, request, handler):
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self.random.random()
+        if roll < self.error_rate:
+            return web.Response(status=self.random.choice((500, 502, 503)))
+        if roll < self.error_rate + self.throttle_rate:
+            return web.Response(status=429, headers={'Retry-After': str(self.retry_after)})
+        response = await handler(request)
+        if self.etags and response.status == 200 and response.body:
+            etag = '"%s"' % hashlib.md5(response.body).hexdigest()
+            if request.headers.get('If-None-Match') == etag:
+                return web.Response(status=304, headers={'ETag': etag})
+            response.headers['ETag'] = etag
+        return response
+
+    def not_found(self, path):
+        if not self.soft_404:
+            return web.Response(status=404, text='Not Found')
+        # Themed 200 page whose length drifts with the path, like most soft-404s.
+        return web.Response(text=f'<html><body><h1>Nothing found for {path}</h1>' + 'sorry ' * self.random.randint(400, 420) + '</body></html>',
+                            content_type='text/html')
+
+    def urlset(self, urls):
+        locs = ''.join(f'<url><loc>{url}</loc></url>' for url in urls)
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'.encode()
+
+    async def handle(self, request):
+        path = request.path
+        base = f'http://{request.host}'
+
+        if path == '/' and 'author' in request.query:
+            author = int(request.query['author'])
+            if 1 <= author <= self.users:
+                raise web.HTTPMovedPermanently(f'{base}/author/user{author}/')
+            return self.not_found(path)
+        if path == '/':
+            return web.Response(body=self.home, content_type='text/html')
+        if path == '/feed/':
+            return web.Response(text='<rss><channel><generator>https://wordpress.org/?v=6.4.2</generator></channel></rss>', content_type='application/rss+xml')
+        if path == '/robots.txt':
+            return web.Response(text=f'User-agent: *\nDisallow: /wp-admin/\nAllow: /wp-admin/admin-ajax.php\nSitemap: {base}/wp-sitemap.xml\n')
+        if path == '/readme.html':
+            return web.Response(text='<h1>WordPress</h1><br /> Version 6.4.2', content_type='text/html')
+        if path in ('/wp-login.php', '/wp-admin/', '/wp-includes/', '/xmlrpc.php'):
+            return web.Response(text='ok')
+        if path in ('/debug.log', '/wp-content/debug.log'):
+            return web.Response(body=self.log, content_type='text/plain')
+        if path == '/wp-config.php.bak':
+            return web.Response(text="<?php define('DB_NAME', 'wordpress');")
+        if path == '/wp-includes/rss-functions.php':
+            # What PHP 8 prints with display_errors and html_errors on.
+            return web.Response(text='<br />\n<b>Fatal error</b>:  Uncaught Error: Call to undefined function _deprecated_file() in '
+                                     '/var/www/html/wp-includes/rss-functions.php:8\nStack trace:\n#0 {main}\n  thrown in '
+                                     '<b>/var/www/html/wp-includes/rss-functions.php</b> on line <b>8</b><br />\n', content_type='text/html')
+        if path in ('/wp-content/uploads/', '/wp-content/plugins/'):
+            entries = ''.join(f'<a href="{i}/">{i}/</a>\n' for i in range(2000, 2025))
+            return web.Response(text=f'<html><title>Index of {path}</title><pre>{entries}</pre></html>', content_type='text/html')
+
+        if path == '/wp-sitemap.xml':
+            chunks = range(0, self.sitemap_urls, self.sitemap_chunk)
+            locs = ''.join(f'<sitemap><loc>{base}/wp-sitemap-posts-{i}.xml{".gz" if i % 2 else ""}</loc></sitemap>' for i in range(len(chunks)))
+            return web.Response(text=f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</sitemapindex>',
+                                content_type='application/xml')
+        if path.startswith('/wp-sitemap-posts-'):
+            index = int(path[len('/wp-sitemap-posts-'):].split('.')[0])
+            start = index * self.sitemap_chunk
+            body = self.urlset(f'{base}/post-{n}/' for n in range(start, min(start + self.sitemap_chunk, self.sitemap_urls)))
+            if path.endswith('.gz'):
+                return web.Response(body=gzip.compress(body), content_type='application/x-gzip')
+            return web.Response(body=body, content_type='application/xml')
+        if path.startswith('/post-'):
+            n = int(path[len('/post-'):].strip('/') or 0)
+            return web.Response(body=self.home if n % 3 == 0 else b'<html><body><p>' + b'post ' * 500 + b'</p></body></html>', content_type='text/html')
+
+        if path == '/wp-json/wp/v2/users' and self.users_api:
+            per_page = int(request.query.get('per_page', 10))
+            page = int(request.query.get('page', 1))
+            pages = max(1, -(-self.users // per_page))
+            users = [{'id': n, 'name': f'User {n}', 'slug': f'user{n}'} for n in range((page - 1) * per_page + 1, min(page * per_page, self.users) + 1)]
+            return web.json_response(users, headers={'X-WP-Total': str(self.users), 'X-WP-TotalPages': str(pages)})
+        if path.startswith('/wp-json/'):
+            return web.Response(status=401, text='{"code":"rest_forbidden"}', content_type='application/json')
+
+        if path.startswith('/wp-content/plugins/'):
+            slug, _, name = path[len('/wp-content/plugins/'):].partition('/')
+            installed = {plugin.split('/')[0]: plugin for plugin in self.plugins}
+            if slug in installed:
+                if name == 'readme.txt':
+                    return web.Response(text=f'=== {slug} ===\nStable tag: 2.{len(slug)}\n\n' + '== Changelog ==\n' * 2000)
+                if name == installed[slug].partition('/')[2]:
+                    return web.Response(text='')
+
+        return self.not_found(path)
+
+def serve(site, host, port):
+    web.run_app(site.app(), host=host, port=port, print=None, access_log=None)
+
+def wait_for_port(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection((host, port), timeout=0.2):
+            return
+        time.sleep(0.05)
+    raise RuntimeError(f'mock server did not start on {host}:{port}')
+
+class TimedTransport(wp.Transport):
+    # Records the wall time of every request, from waiting for a slot to the
+    # end of the body read, as the scanner experiences it.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+
+    @contextlib.asynccontextmanager
+    async def request(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            async with super().request(*args, **kwargs) as response:
+                yield response
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+class CountingSink:
+
+    def __init__(self):
+        self.count = 0
+
+    def emit(self, finding):
+        self.count += 1
+
+    def close(self):
+        pass
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+def run_case(args):
+    # Child side: one scan with the given checks, metrics on stdout as JSON.
+    transport = TimedTransport(wp.RequestLimiter(args.concurrency, args.per_host), args.concurrency, args.per_host,
+                               timeout=args.timeout, rate=args.rate, max_backoff=args.max_backoff)
+    sink = CountingSink()
+    analyzer = wp.HtmlAnalyzer(args.html_workers)
+    http_cache = wp.HttpCache(args.http_cache) if args.http_cache else None
+    options = dict(reporter=wp.Reporter([sink]), analyzer=analyzer, plugin_mode=args.plugin_mode, http_cache=http_cache,
+                   vulns=wp.VulnerabilityIndex(args.vuln_db) if args.vuln_db else None,
+                   fingerprints=wp.HashIndex.load(args.fingerprint_db) if args.fingerprint_db else None)
+
+    async def scan():
+        async with transport:
+            await wp.AsyncWordPressScanner(args.url, 'wpscan-bench', transport, **options).scan(args.run.split(','))
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(scan())
+    finally:
+        analyzer.close()
+        if http_cache is not None:
+            http_cache.close()
+    wall = time.perf_counter() - start
+
+    latencies = sorted(transport.latencies)
+    json.dump({'requests': len(latencies), 'findings': sink.count, 'wall': wall, 'rps': len(latencies) / wall if wall else 0.0,
+               'p50': percentile(latencies, 0.50) * 1000, 'p95': percentile(latencies, 0.95) * 1000,
+               'p99': percentile(latencies, 0.99) * 1000, 'rss': peak_rss_mb()}, sys.stdout)
+
+def measure(args, checks):
+    command = [sys.executable, os.path.abspath(__file__), '--run', checks, '--url', args.url,
+               '--concurrency', str(args.concurrency), '--per-host', str(args.per_host), '--rate', str(args.rate),
+               '--timeout', str(args.timeout), '--max-backoff', str(args.max_backoff), '--plugin-mode', args.plugin_mode]
+    for flag, value in (('--html-workers', args.html_workers), ('--vuln-db', args.vuln_db), ('--fingerprint-db', args.fingerprint_db),
+                        ('--http-cache', args.http_cache)):
+        if value is not None:
+            command += [flag, str(value)]
+
+    runs = []
+    for _ in range(args.repeat):
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    # The run with the median wall time stands for the case.
+    runs.sort(key=lambda run: run['wall'])
+    return runs[len(runs) // 2]
+
+COLUMNS = (('requests', 'requests', '{:>9}'), ('rps', 'req/s', '{:>9.1f}'), ('p50', 'p50 ms', '{:>9.1f}'), ('p95', 'p95 ms', '{:>9.1f}'),
+           ('p99', 'p99 ms', '{:>9.1f}'), ('wall', 'wall s', '{:>9.2f}'), ('rss', 'rss MB', '{:>9.1f}'))
+
+def compare(results, baseline, tolerance):
+    # A case regresses when it gets slower (wall, p95) or does fewer
+    # requests per second by more than the tolerance.
+    regressions = []
+    for case, result in results.items():
+        before = baseline.get(case)
+        if not before:
+            continue
+        changes = []
+        for metric, worse in (('wall', 1), ('p95', 1), ('rps', -1), ('rss', 1)):
+            if before[metric]:
+                change = (result[metric] - before[metric]) / before[metric]
+                changes.append(f'{metric} {change:+.0%}')
+                if metric != 'rss' and change * worse > tolerance:
+                    regressions.append(f'{case}: {metric} {before[metric]:.2f} -> {result[metric]:.2f} ({change:+.0%})')
+        print(f'  {case:<22} ' + '  '.join(changes))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the WordPress scanner against a local mock site')
+    parser.add_argument('--checks', default=','.join(CHECKS) + ',full', help='Comma-separated cases to run; "full" runs every check in one scan')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the median run is reported')
+    parser.add_argument('--baseline', help='Compare against metrics saved with --save-baseline; exit 1 on regression')
+    parser.add_argument('--save-baseline', help='Write the metrics of this run to a JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Relative slowdown accepted before a case counts as a regression')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--latency', type=float, default=0.005, help='Seconds the mock site waits before every response')
+    parser.add_argument('--jitter', type=float, default=0.005, help='Extra random delay in seconds, uniform in [0, jitter]')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of responses that are 500/502/503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of responses that are 429')
+    parser.add_argument('--retry-after', type=int, default=0, help='Retry-After seconds sent with a 429')
+    parser.add_argument('--soft-404', action='store_true', help='Answer unknown paths with a 200 "not found" page')
+    parser.add_argument('--sitemap-urls', type=int, default=1000, help='Pages listed across the sitemap index')
+    parser.add_argument('--sitemap-chunk', type=int, default=500, help='Pages per child sitemap')
+    parser.add_argument('--body-size', type=int, default=1 << 20, help='Bytes in each debug.log')
+    parser.add_argument('--users', type=int, default=30, help='Users exposed by the REST API')
+    parser.add_argument('--closed-users-api', action='store_true', help='Refuse the REST users endpoint so enumeration falls back to ?author=N')
+    parser.add_argument('--plugins', type=int, default=20, help='Installed plugins, taken from the top of data/plugins.txt')
+    parser.add_argument('--etags', action='store_true', help='Send ETags and answer matching If-None-Match with 304')
+    parser.add_argument('--seed', type=int, default=1)
+    # Scanner settings, passed to every case.
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--per-host', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=1000, help='Per-host request rate of the scanner; the default keeps the limiter out of the way')
+    parser.add_argument('--timeout', type=float, default=20)
+    parser.add_argument('--max-backoff', type=float, default=5)
+    parser.add_argument('--plugin-mode', choices=['passive', 'aggressive'], default='aggressive')
+    parser.add_argument('--html-workers', type=int, default=None)
+    parser.add_argument('--vuln-db')
+    parser.add_argument('--fingerprint-db')
+    parser.add_argument('--http-cache', help='Scanner HTTP cache file, shared by every run so later runs revalidate')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        return run_case(args)
+
+    site = MockSite(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.retry_after, args.soft_404,
+                    args.sitemap_urls, args.sitemap_chunk, args.body_size, args.users, not args.closed_users_api, args.plugins, args.etags, args.seed)
+    server = multiprocessing.Process(target=serve, args=(site, args.host, args.port), daemon=True)
+    server.start()
+    args.url = f'http://{args.host}:{args.port}'
+    try:
+        wait_for_port(args.host, args.port)
+        print(f'{"case":<22}' + ''.join(f'{label:>9}' for _, label, _ in COLUMNS))
+        results = {}
+        for case in args.checks.split(','):
+            results[case] = measure(args, ','.join(CHECKS) if case == 'full' else case)
+            print(f'{case:<22}' + ''.join(fmt.format(results[case][name]) for name, _, fmt in COLUMNS), flush=True)
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f'\nAgainst {args.baseline}:')
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'{wp.Code_Color.critical} Regression in {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
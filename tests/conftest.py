@@ -0,0 +1,4 @@
+import os, sys
+
+# The scanner and the benchmark mock are top-level scripts, not a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
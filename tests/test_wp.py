@@ -0,0 +1,965 @@
+import os, sys, gzip, json, socket, asyncio, subprocess, sqlite3, zipfile, contextlib, multiprocessing
+from aiohttp import web
+
+import wp
+from bench import MockSite, serve as serve_process, wait_for_port
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'wp.py')
+
+class ListSink:
+
+    def __init__(self):
+        self.findings = []
+
+    def emit(self, finding):
+        self.findings.append(finding)
+
+    def close(self):
+        pass
+
+    def kinds(self, kind):
+        return [finding for finding in self.findings if finding.kind == kind]
+
+@contextlib.asynccontextmanager
+async def serve(app):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    try:
+        yield f'http://127.0.0.1:{runner.addresses[0][1]}'
+    finally:
+        await runner.cleanup()
+
+async def scan(app, checks, **options):
+    sink = ListSink()
+    async with serve(app) as url, wp.Transport(rate=1000, max_backoff=0.1) as transport:
+        scanner = wp.AsyncWordPressScanner(url, 'test', transport, reporter=wp.Reporter([sink]), **options)
+        await scanner.scan(checks)
+    return scanner, sink
+
+def not_wordpress():
+    async def handle(request):
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    return app
+
+def catch_all():
+    # Not WordPress, but every path answers 200 with the same themed page.
+    async def handle(request):
+        return web.Response(text=f'<html><body><h1>Nothing at {request.path}</h1>' + 'sorry ' * 400 + '</body></html>',
+                            content_type='text/html')
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    return app
+
+class Concurrency:
+    # Peak number of requests, and of distinct sites, a test server sees at once.
+
+    def __init__(self):
+        self.requests = self.peak_requests = 0
+        self.sites = {}
+        self.peak_sites = 0
+
+    def app(self, delay=0.02):
+        async def handle(request):
+            site = request.path.split('/')[1]
+            self.requests += 1
+            self.sites[site] = self.sites.get(site, 0) + 1
+            self.peak_requests = max(self.peak_requests, self.requests)
+            self.peak_sites = max(self.peak_sites, len(self.sites))
+            try:
+                await asyncio.sleep(delay)
+                return web.Response(text='ok')
+            finally:
+                self.requests -= 1
+                self.sites[site] -= 1
+                if not self.sites[site]:
+                    del self.sites[site]
+
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handle)
+        return app
+
+def test_request_limiter_caps_total_and_per_host():
+    async def main():
+        limiter = wp.RequestLimiter(total=3, per_host=2)
+        active, peak = {}, {'total': 0}
+
+        async def request(host):
+            async with limiter.slot(f'http://{host}/'):
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+                peak['total'] = max(peak['total'], sum(active.values()))
+                await asyncio.sleep(0.01)
+                active[host] -= 1
+
+        await asyncio.gather(*(request(f'host{n % 2}') for n in range(30)))
+        assert peak.pop('total') == 3
+        assert max(peak.values()) == 2
+        assert limiter.hosts == {}
+
+    asyncio.run(main())
+
+def test_fleet_target_normalization():
+    assert wp.FleetScanner.normalize(' example.com/ \n') == 'http://example.com'
+    assert wp.FleetScanner.normalize('https://example.com') == 'https://example.com'
+    assert wp.FleetScanner.normalize('# comment') is None
+    assert wp.FleetScanner.normalize('\n') is None
+
+def test_fleet_caps_targets_and_requests(tmp_path):
+    server = Concurrency()
+
+    async def main():
+        async with serve(server.app()) as url:
+            targets = tmp_path / 'targets.txt'
+            targets.write_text(''.join(f'{url}/site{n}\n' for n in range(12)))
+            fleet = wp.FleetScanner(str(targets), 'test', ['readme'], wp.Transport(wp.RequestLimiter(100, 4)), max_targets=3)
+            await fleet.run()
+            return fleet
+
+    fleet = asyncio.run(main())
+    assert (fleet.done, fleet.failed) == (12, 0)
+    assert server.peak_sites <= 3
+    assert server.peak_requests <= 4
+
+def fallback_site(log):
+    # /head answers HEAD, /range only a Range GET, /full only a plain GET.
+    async def handle(request):
+        name = request.path.strip('/')
+        log.append((name, request.method, request.headers.get('Range')))
+        if name not in ('head', 'range', 'full'):
+            return web.Response(status=404)
+        if request.method == 'HEAD':
+            return web.Response(status=200 if name == 'head' else 405)
+        if request.headers.get('Range'):
+            return web.Response(status=206, body=b'x') if name == 'range' else web.Response(status=416)
+        return web.Response(text='full body')
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    return app
+
+def test_probe_falls_back_from_head_to_range_to_get():
+    log = []
+
+    async def main():
+        async with serve(fallback_site(log)) as url, wp.Transport() as transport:
+            scanner = wp.AsyncWordPressScanner(url, 'test', transport)
+            return {name: await scanner.probe(f'{url}/{name}') for name in ('head', 'range', 'full', 'missing')}
+
+    found = asyncio.run(main())
+    assert [name for name, response in found.items() if response is not None] == ['head', 'range', 'full']
+    requests = {}
+    for name, method, byte_range in log:
+        if name in found:
+            requests.setdefault(name, []).append((method, byte_range))
+    assert requests == {'head': [('HEAD', None)],
+                        'range': [('HEAD', None), ('GET', 'bytes=0-0')],
+                        'full': [('HEAD', None), ('GET', 'bytes=0-0'), ('GET', None)],
+                        'missing': [('HEAD', None)]}
+
+def test_probe_takes_a_501_as_a_refusal_without_retrying():
+    log = []
+
+    async def handle(request):
+        if request.path != '/file':
+            return web.Response(status=404)
+        log.append((request.method, request.headers.get('Range')))
+        if request.method == 'HEAD' or request.headers.get('Range'):
+            return web.Response(status=501)
+        return web.Response(text='full body')
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+
+    async def main():
+        async with serve(app) as url, wp.Transport(rate=1000, max_backoff=0.1) as transport:
+            scanner = wp.AsyncWordPressScanner(url, 'test', transport, reporter=wp.Reporter())
+            return await scanner.probe(f'{url}/file')
+
+    assert asyncio.run(main()).status == 200
+    assert log == [('HEAD', None), ('GET', 'bytes=0-0'), ('GET', None)]
+
+def test_response_cache_single_flight():
+    async def main():
+        cache = wp.ResponseCache()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'response', 10
+
+        results = await asyncio.gather(*(cache.get('key', load) for _ in range(5)))
+        assert results == ['response'] * 5
+        assert len(calls) == 1
+        assert await cache.get('key', load) == 'response'
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+def test_response_cache_keeps_to_its_byte_budget_and_skips_failures():
+    async def main():
+        cache = wp.ResponseCache(max_body=100, max_bytes=250)
+        for n in range(5):
+            await cache.get(n, lambda n=n: asyncio.sleep(0, (f'response {n}', 100)))
+        assert list(cache.entries) == [3, 4]
+        assert cache.size == 200
+        await cache.get('big', lambda: asyncio.sleep(0, ('big', 101)))
+        assert 'big' not in cache.entries
+        await cache.get('failed', lambda: asyncio.sleep(0, (None, 0)))
+        assert 'failed' not in cache.entries
+
+    asyncio.run(main())
+
+def test_shared_failed_fetch_fails_every_caller():
+    async def main():
+        async with wp.Transport(rate=1000, max_backoff=0.01, breaker_threshold=100) as transport:
+            scanner = wp.AsyncWordPressScanner('http://127.0.0.1:1', 'test', transport, reporter=wp.Reporter())
+
+            async def fetch_as(check):
+                wp.CURRENT_CHECK.set(check)
+                return await scanner.fetch('http://127.0.0.1:1/', retries=1)
+
+            assert await asyncio.gather(fetch_as('one'), fetch_as('two')) == [None, None]
+            await fetch_as('three')
+            return scanner.errors
+
+    assert set(asyncio.run(main())) == {'one', 'two', 'three'}
+
+def test_early_exit_body_is_not_served_to_a_full_read():
+    async def main():
+        async with serve(MockSite().app()) as url, wp.Transport(rate=1000) as transport:
+            scanner = wp.AsyncWordPressScanner(url, 'test', transport, reporter=wp.Reporter())
+            partial = await scanner.fetch(f'{url}/debug.log', patterns={'notice': wp.re.compile(rb'PHP Notice')}, until_match=True)
+            full = await scanner.fetch(f'{url}/debug.log')
+            return partial, full
+
+    partial, full = asyncio.run(main())
+    assert partial.truncated
+    assert not full.truncated and len(full.body) == 1 << 20
+
+def test_scanner_fetches_a_shared_url_once():
+    log = []
+
+    async def main():
+        async with serve(fallback_site(log)) as url, wp.Transport() as transport:
+            scanner = wp.AsyncWordPressScanner(url, 'test', transport)
+            responses = await asyncio.gather(*(scanner.fetch(f'{url}/full') for _ in range(3)))
+            head = await scanner.fetch(f'{url}/full', method='HEAD')
+            return responses, head
+
+    responses, head = asyncio.run(main())
+    assert [response.body for response in responses] == [b'full body'] * 3
+    assert head.status == 200
+    assert log == [('full', 'GET', None)]
+
+def test_retry_after_and_backoff():
+    assert wp.parse_retry_after('3') == 3
+    assert wp.parse_retry_after('soon') is None
+    assert wp.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    transport = wp.Transport(max_backoff=5)
+    assert transport.backoff(0, '2') == 2
+    assert transport.backoff(0, '10') is None
+    assert all(0 <= transport.backoff(attempt) <= 5 for attempt in range(20))
+
+def test_rate_limited_host_is_throttled_and_retried():
+    log = []
+
+    async def handle(request):
+        log.append(request.path)
+        if len(log) == 1:
+            return web.Response(status=429, headers={'Retry-After': '0'})
+        return web.Response(text='ok')
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+
+    async def main():
+        async with serve(app) as url, wp.Transport(rate=20) as transport:
+            scanner = wp.AsyncWordPressScanner(url, 'test', transport)
+            response = await scanner.fetch(f'{url}/page')
+            return response, transport.host_state(url)
+
+    response, state = asyncio.run(main())
+    assert response.body == b'ok'
+    assert log == ['/page', '/page']
+    assert state.rate < state.max_rate
+
+def test_breaker_skips_an_unreachable_host():
+    async def main():
+        # A port that was just free: every connect is refused.
+        server = await asyncio.start_server(lambda reader, writer: None, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+        url = f'http://127.0.0.1:{port}'
+
+        async with wp.Transport(breaker_threshold=2, breaker_cooldown=60, max_backoff=0.01) as transport:
+            scanner = wp.AsyncWordPressScanner(url, 'test', transport)
+            assert await scanner.fetch(f'{url}/one') is None
+            state = transport.host_state(url)
+            assert state.failures == 2
+            assert not state.available()
+            assert await scanner.fetch(f'{url}/two') is None
+            assert state.failures == 2
+
+    asyncio.run(main())
+
+def test_non_positive_rate_is_rejected():
+    result = subprocess.run([sys.executable, SCRIPT, '--rate', '0', 'http://127.0.0.1:1'], capture_output=True, text=True)
+    assert result.returncode == 2
+    assert '--rate: must be greater than 0' in result.stderr
+
+def test_chunk_matcher_finds_a_match_split_across_chunks():
+    matcher = wp.ChunkMatcher({'fatal': wp.FATAL_ERROR})
+    assert not matcher.feed(b'x' * 10000 + b'Fatal er')
+    assert matcher.feed(b'ror: Call to undefined function in /var/www/wp-includes/rss-functions.php on line 8')
+    assert matcher.matches['fatal'] is not None
+    assert len(matcher.tail) <= matcher.overlap
+
+def test_fatal_error_pattern_reads_php_error_formats():
+    outputs = (b'<br />\n<b>Fatal error</b>:  Uncaught Error: Call to undefined function _deprecated_file() in /srv/wp/wp-includes/rss-functions.php:8\n'
+               b'Stack trace:\n#0 {main}\n  thrown in <b>/srv/wp/wp-includes/rss-functions.php</b> on line <b>8</b><br />',
+               b'<b>Fatal error</b>:  Call to undefined function _deprecated_file() in <b>/srv/wp/wp-includes/rss-functions.php</b> on line <b>8</b>',
+               b'PHP Fatal error:  Call to undefined function _deprecated_file() in /srv/wp/wp-includes/rss-functions.php on line 8')
+    for output in outputs:
+        assert wp.FATAL_ERROR.search(output).group(1) == b'/srv/wp/wp-includes/rss-functions.php'
+
+def sitemap_site(log, pages=2):
+    # robots.txt points at a gzipped sitemap; /wp-sitemap.xml is an index
+    # nested four levels deep. Every page but /page/0 is formless.
+    def urlset(urls):
+        return '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' + ''.join(f'<url><loc>{url}</loc></url>' for url in urls) + '</urlset>'
+
+    def index(urls):
+        return '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' + ''.join(f'<sitemap><loc>{url}</loc></sitemap>' for url in urls) + '</sitemapindex>'
+
+    async def handle(request):
+        path = request.path
+        log.append(path)
+        base = f'{request.scheme}://{request.host}'
+        if path == '/robots.txt':
+            return web.Response(text=f'User-agent: *\nSitemap: {base}/extra.xml.gz\n')
+        if path == '/extra.xml.gz':
+            return web.Response(body=gzip.compress(urlset([f'{base}/page/gz']).encode()))
+        if path == '/wp-sitemap.xml':
+            return web.Response(text=index([f'{base}/nested/1']))
+        if path.startswith('/nested/'):
+            level = int(path.rsplit('/', 1)[1])
+            return web.Response(text=index([f'{base}/nested/{level + 1}']) if level < 4 else urlset([f'{base}/page/deep']))
+        if path == '/pages.xml':
+            return web.Response(text=urlset([f'{base}/page/{n}' for n in range(pages)]))
+        if path.startswith('/page/'):
+            form = '<form><input type="text" name="q"></form>' if path == '/page/0' else ''
+            return web.Response(text=f'<html><body>{form}</body></html>', content_type='text/html')
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+    return app
+
+def crawl(app, seeds=None, **limits):
+    async def main():
+        async with serve(app) as url, wp.Transport(rate=1000, max_backoff=0.1) as transport:
+            scanner = wp.AsyncWordPressScanner(url, 'test', transport)
+            forms = []
+            crawler = wp.SitemapCrawler(scanner, forms.append, analyzer, **limits)
+            if seeds is not None:
+                async def fixed_seeds():
+                    return [url + seed for seed in seeds]
+                crawler.seeds = fixed_seeds
+            await crawler.run()
+            return crawler, [form[len(url):] for form in forms]
+
+    analyzer = wp.HtmlAnalyzer(1)
+    try:
+        return asyncio.run(main())
+    finally:
+        analyzer.close()
+
+def test_sitemap_crawler_follows_gzip_and_nested_indexes_to_max_depth():
+    log = []
+    crawler, forms = crawl(sitemap_site(log), max_depth=2)
+    assert '/page/gz' in log
+    assert '/nested/2' in log and '/nested/3' not in log
+    assert crawler.pages == 1
+    assert forms == []
+
+def test_sitemap_crawler_stops_at_max_urls():
+    log = []
+    crawler, forms = crawl(sitemap_site(log, pages=50), seeds=['/pages.xml'], max_urls=10)
+    assert crawler.pages == 10
+    assert len([path for path in log if path.startswith('/page/')]) == 10
+    assert forms == ['/page/0']
+
+def test_sitemap_parser_ignores_extension_locs():
+    pages, sitemaps = [], []
+    parser = wp.SitemapParser(pages.append, sitemaps.append)
+    parser.feed(b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+                b'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">'
+                b'<url><loc>http://a/post/</loc><image:image><image:loc>http://a/cover.jpg</image:loc></image:image></url>'
+                b'<url><loc>http://a/page/</loc></url></urlset>')
+    assert pages == ['http://a/post/', 'http://a/page/']
+    assert sitemaps == []
+
+def test_has_text_input_form():
+    assert wp.has_text_input_form(b'<form action="/s"><div><input type="TEXT" name="q"></div></form>')
+    assert wp.has_text_input_form(b'<FORM><input type="hidden"><input type="text"></FORM>')
+    assert not wp.has_text_input_form(b'<form><input type="submit"></form><input type="text">')
+    assert not wp.has_text_input_form(b'<html><body>no forms</body></html>')
+    assert not wp.has_text_input_form(b'')
+
+def test_html_analyzer_prefilter_skips_the_process_pool():
+    async def main():
+        analyzer = wp.HtmlAnalyzer(1)
+        try:
+            assert not await analyzer.has_text_input_form(b'<html><input type="text"></html>')
+            assert analyzer.pool is None
+            assert await analyzer.has_text_input_form(b'<form><input type="text"></form>')
+            assert analyzer.pool is not None
+        finally:
+            analyzer.close()
+
+    asyncio.run(main())
+
+def test_bounded_map_keeps_order_and_bounds_concurrency():
+    active, peak = [0], [0]
+
+    async def square(n):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.001 * (n % 3))
+        active[0] -= 1
+        return n * n
+
+    results = asyncio.run(wp.bounded_map(square, iter(range(50)), 4))
+    assert results == [(n, n * n) for n in range(50)]
+    assert peak[0] == 4
+
+def test_plugin_database_load(tmp_path):
+    wordlist = tmp_path / 'plugins.txt'
+    wordlist.write_text('# header\nakismet/akismet.php   # Akismet\nbare-slug\nakismet/other.php\n\n')
+    database = wp.PluginDatabase.load(str(wordlist))
+    assert wp.PluginDatabase.load(str(wordlist)) is database
+    assert list(database) == ['akismet', 'bare-slug']
+    assert database.main_file('akismet') == 'akismet.php'
+    assert 'bare-slug' in database and 'missing' not in database
+
+def test_version_key_orders_versions():
+    assert wp.version_key('6.4') == wp.version_key('6.4.0')
+    assert wp.version_key('6.4') < wp.version_key('6.4.2') < wp.version_key('6.10')
+    assert wp.version_key('trunk') is None
+
+def test_vulnerability_index_range_boundaries(tmp_path):
+    feed = tmp_path / 'feed.json'
+    feed.write_text(json.dumps({'v1': {'title': 'XSS', 'cve': 'CVE-1', 'cvss': {'score': 6.1}, 'software': [
+        {'type': 'plugin', 'slug': 'akismet', 'affected_versions': {'a': {
+            'from_version': '2.0', 'from_inclusive': True, 'to_version': '2.5', 'to_inclusive': False}}}]}}))
+    path = str(tmp_path / 'vulns.db')
+    assert wp.VulnerabilityIndex.build(str(feed), path) == 1
+    index = wp.VulnerabilityIndex(path)
+    assert index.lookup('plugin', 'akismet', '2.0') == [('v1', 'XSS', 'CVE-1', 6.1)]
+    assert index.lookup('plugin', 'akismet', '2.4.9')
+    assert index.lookup('plugin', 'akismet', '2.5') == []
+    assert index.lookup('plugin', 'akismet', '1.9') == []
+    assert index.lookup('plugin', 'other', '2.1') == []
+    assert index.lookup('plugin', 'akismet', None) == []
+
+def test_fingerprint_collects_everything_in_one_pass():
+    fingerprint = wp.Fingerprint()
+    fingerprint.feed(b'<meta name="generator" content="WordPress 6.4.2" />'
+                     b'<link rel="https://api.w.org/" href="https://example.com/wp-json/" />'
+                     b'<link rel="pingback" href="https://example.com/xmlrpc.php" />'
+                     b'<link href="/wp-content/themes/twentytwentyfour/style.css?ver=1.0" />'
+                     b'<script src="/wp-content/plugins/akismet/akismet.js?ver=5.3"></script>'
+                     b'<img src="/wp-content/plugins/gallery/img.png" />')
+    fingerprint.feed(b'<generator>https://wordpress.org/?v=6.3</generator>')
+    assert fingerprint.version == '6.4.2'
+    assert fingerprint.themes == {'twentytwentyfour': '1.0'}
+    assert fingerprint.plugins == {'akismet': '5.3', 'gallery': None}
+    assert fingerprint.rest_api == 'https://example.com/wp-json/'
+    assert fingerprint.pingback == 'https://example.com/xmlrpc.php'
+    assert fingerprint.is_wordpress and fingerprint.xmlrpc
+    assert not wp.Fingerprint().is_wordpress
+
+def test_fingerprint_version_ignores_bundled_library_versions():
+    head = (b'<script src="/wp-includes/js/jquery/jquery.min.js?ver=3.7.1"></script>'
+            b'<script src="/wp-includes/js/jquery/jquery-migrate.min.js?ver=3.4.1"></script>'
+            b'<link rel="stylesheet" href="/wp-includes/css/dist/block-library/style.min.css?ver=6.4.2">'
+            b'<script>window._wpemojiSettings = {"concatemoji":"https:\\/\\/example.com\\/wp-includes\\/js\\/wp-emoji-release.min.js?ver=6.4.2"};</script>')
+    fingerprint = wp.Fingerprint()
+    fingerprint.feed(head)
+    assert fingerprint.version == '6.4.2'
+    assert fingerprint.core_assets == {'6.4.2': 2}
+
+    fingerprint = wp.Fingerprint()
+    fingerprint.feed(b'<script src="/wp-includes/js/jquery/jquery.min.js?ver=3.7.1"></script>')
+    assert fingerprint.version is None
+    assert fingerprint.is_wordpress
+
+def themes_site(log, homepage):
+    async def handle(request):
+        log.append(request.path)
+        if request.path == '/':
+            return web.Response(text=homepage, content_type='text/html')
+        if request.path == '/wp-json/wp/v2/themes':
+            return web.json_response([{'stylesheet': 'storefront', 'version': '4.5'}])
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    return app
+
+def test_check_themes_trusts_a_fingerprinted_theme():
+    log = []
+    homepage = '<link rel="stylesheet" href="/wp-content/themes/astra/style.css?ver=4.1" />'
+    scanner, sink = asyncio.run(scan(themes_site(log, homepage), ['check-themes'], gate=False))
+    assert [(finding.data['slug'], finding.data['version']) for finding in sink.kinds('theme')] == [('astra', '4.1')]
+    assert '/wp-content/themes/' not in log and '/wp-json/wp/v2/themes' not in log
+
+def test_check_themes_asks_the_rest_api_without_a_fingerprint():
+    log = []
+    scanner, sink = asyncio.run(scan(themes_site(log, '<html></html>'), ['check-themes'], gate=False))
+    assert [(finding.data['slug'], finding.data['version']) for finding in sink.kinds('theme')] == [('storefront', '4.5')]
+    assert '/wp-json/wp/v2/themes' in log
+
+def write_release(path, version, script):
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('wordpress/wp-includes/version.php', f"<?php\n$wp_version = '{version}';\n")
+        archive.writestr('wordpress/wp-includes/js/common.js', 'shared();')
+        archive.writestr('wordpress/wp-includes/js/changed.js', script)
+
+def test_hash_index_build_and_narrow(tmp_path):
+    releases = tmp_path / 'releases'
+    releases.mkdir()
+    write_release(releases / 'wordpress-6.3.zip', '6.3', 'old();')
+    write_release(releases / 'wordpress-6.4.zip', '6.4', 'new();')
+    path = str(tmp_path / 'hashes.json.gz')
+    assert wp.HashIndex.build(str(releases), path) == (2, 1)
+    index = wp.HashIndex.load(path)
+    candidates = set(range(len(index.versions)))
+    name = index.best_split(candidates, set())
+    assert name == 'wp-includes/js/changed.js'
+    remaining = index.narrow(candidates, name, wp.hashlib.md5(b'new();').hexdigest())
+    assert [index.versions[version] for version in remaining] == ['6.4']
+
+def test_hash_index_build_from_unpacked_releases(tmp_path, capsys):
+    releases = tmp_path / 'releases'
+    for version, script in (('6.3', 'old();'), ('6.4', 'new();')):
+        root = releases / f'wordpress-{version}' / 'wordpress' / 'wp-includes'
+        (root / 'js').mkdir(parents=True)
+        (root / 'version.php').write_text(f"<?php\n$wp_version = '{version}';\n")
+        (root / 'js' / 'changed.js').write_text(script)
+    (releases / 'notes').mkdir()
+    assert wp.HashIndex.build(str(releases), str(tmp_path / 'hashes.json.gz')) == (2, 1)
+    assert 'Skipped notes' in capsys.readouterr().out
+
+def test_buffered_sinks_write_every_finding(tmp_path):
+    findings = [wp.Finding('http://a', 'readme', 'readme', 'ok', f'found {n}', {'n': n}) for n in range(5)]
+    jsonl = wp.JsonLinesSink(str(tmp_path / 'out.jsonl'), batch_size=2)
+    sqlite = wp.SQLiteSink(str(tmp_path / 'out.db'), batch_size=2)
+    for finding in findings:
+        jsonl.emit(finding)
+        sqlite.emit(finding)
+    jsonl.close()
+    sqlite.close()
+    lines = [json.loads(line) for line in (tmp_path / 'out.jsonl').read_text().splitlines()]
+    assert [line['data']['n'] for line in lines] == list(range(5))
+    rows = sqlite3.connect(str(tmp_path / 'out.db')).execute('SELECT message FROM findings ORDER BY id').fetchall()
+    assert [row[0] for row in rows] == [f'found {n}' for n in range(5)]
+
+def test_reporter_fans_findings_out_to_every_sink():
+    async def handle(request):
+        return web.Response(text='readme') if request.path == '/readme.html' else web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    scanner, sink = asyncio.run(scan(app, ['readme', 'debug-log'], gate=False))
+    assert [(finding.check, finding.kind) for finding in sink.findings] == [('readme', 'readme')]
+    assert sink.findings[0].data == {'url': f'{scanner.url}/readme.html'}
+
+def test_checks_run_against_mock_site():
+    scanner, sink = asyncio.run(scan(MockSite().app(), ['readme', 'backup-file', 'robots-text', 'directory-listing', 'full-path-disclosure'],
+                                     listing_max_depth=0))
+    assert [finding.data['path'] for finding in sink.kinds('full-path-disclosure')] == ['/var/www/html/wp-includes/rss-functions.php']
+    assert sink.kinds('wordpress')
+    assert [finding.data['url'].rsplit('/', 1)[1] for finding in sink.kinds('backup-file')] == ['wp-config.php.bak']
+    assert sink.kinds('readme')
+    assert [finding.data['entry'] for finding in sink.kinds('robots-entry')] == ['Disallow: /wp-admin/']
+    assert sorted(finding.data['url'].split('/', 3)[3] for finding in sink.kinds('directory-listing')) == \
+        ['wp-content/plugins/', 'wp-content/uploads/']
+
+def test_full_path_disclosure_reads_a_500_page_once():
+    log = []
+
+    async def handle(request):
+        log.append(request.path)
+        if request.path == '/wp-includes/rss-functions.php':
+            return web.Response(status=500, text='<b>Fatal error</b>:  Uncaught Error: Call to undefined function _deprecated_file() '
+                                                 'in /srv/wp/wp-includes/rss-functions.php:8')
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    scanner, sink = asyncio.run(scan(app, ['full-path-disclosure'], gate=False))
+    assert [finding.data['path'] for finding in sink.kinds('full-path-disclosure')] == ['/srv/wp/wp-includes/rss-functions.php']
+    assert log.count('/wp-includes/rss-functions.php') == 1
+    assert scanner.errors == {}
+
+def test_profiler_records_requests_per_check(tmp_path):
+    profiler = wp.Profiler()
+
+    async def main():
+        async with serve(MockSite().app()) as url, wp.Transport(rate=1000, profiler=profiler) as transport:
+            scanner = wp.AsyncWordPressScanner(url, 'test', transport, reporter=wp.Reporter([ListSink()]))
+            await scanner.scan(['readme', 'backup-file'])
+            return url.split('//', 1)[1]
+
+    host = asyncio.run(main())
+    assert profiler.stats['readme', host]['requests'] >= 1
+    assert profiler.stats['backup-file', host]['requests'] >= 1
+    assert {check for _, check, _, _ in profiler.checks} >= {'readme', 'backup-file'}
+    assert 'readme' in profiler.summary()
+
+    profiler.write_prometheus(str(tmp_path / 'scan.prom'))
+    assert f'wpscan_requests_total{{check="readme",host="{host}"}}' in (tmp_path / 'scan.prom').read_text()
+    profiler.write_chrome_trace(str(tmp_path / 'scan.trace.json'))
+    events = json.loads((tmp_path / 'scan.trace.json').read_text())['traceEvents']
+    assert {event['ph'] for event in events} >= {'M', 'X', 'b', 'e'}
+
+def test_job_store_replays_finished_checks(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    jobs = wp.JobStore(path)
+    scanner, first = asyncio.run(scan(MockSite().app(), ['readme'], jobs=jobs))
+    jobs.close()
+    jobs = wp.JobStore(path)
+    done, findings = jobs.load(scanner.url)
+    jobs.close()
+    assert {'wordpress', 'readme'} <= done
+    assert [finding.kind for finding in findings if finding.check == 'readme'] == ['readme']
+
+def test_resumed_scans_report_each_finding_once(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+
+    async def main():
+        runs = []
+        async with serve(MockSite().app()) as url, wp.Transport(rate=1000) as transport:
+            for checks in (['readme'], ['readme', 'debug-log'], ['readme', 'debug-log', 'xml-rpc']):
+                jobs, sink = wp.JobStore(path), ListSink()
+                await wp.AsyncWordPressScanner(url, 'test', transport, reporter=wp.Reporter([sink]), jobs=jobs).scan(checks)
+                jobs.close()
+                runs.append(sink)
+        return runs
+
+    for sink in asyncio.run(main()):
+        assert len(sink.kinds('wordpress')) == 1
+        assert len(sink.kinds('version')) == 1
+        assert len(sink.kinds('readme')) == 1
+
+def test_job_store_does_not_hold_unbounded_findings(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    jobs = wp.JobStore(path, max_held=3)
+    for check, count in (('listing-inventory', 5), ('readme', 2)):
+        for n in range(count):
+            jobs.emit(wp.Finding('http://a', check, 'entry', 'info', f'entry {n}', {}))
+        jobs.done('http://a', check)
+    assert jobs.held == {}
+    jobs.close()
+    db = sqlite3.connect(path)
+    assert dict(db.execute('SELECT "check", status FROM jobs')) == {'listing-inventory': 'failed', 'readme': 'done'}
+    assert db.execute('SELECT "check", COUNT(*) FROM findings GROUP BY "check"').fetchall() == [('readme', 2)]
+
+def test_resumed_cli_run_rewrites_its_outputs(tmp_path):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = multiprocessing.Process(target=serve_process, args=(MockSite(), '127.0.0.1', port), daemon=True)
+    server.start()
+    try:
+        wait_for_port('127.0.0.1', port)
+        output, findings = tmp_path / 'out.jsonl', tmp_path / 'out.db'
+        runs = []
+        for checks in ('readme,robots-text', 'readme,robots-text,debug-log'):
+            result = subprocess.run([sys.executable, SCRIPT, f'http://127.0.0.1:{port}', '--checks', checks, '--quiet',
+                                     '--resume', str(tmp_path / 'jobs.db'), '--output', str(output), '--sqlite', str(findings)],
+                                    capture_output=True, text=True, timeout=120)
+            assert result.returncode == 0, result.stderr
+            rows = sqlite3.connect(str(findings)).execute('SELECT COUNT(*) FROM findings').fetchone()[0]
+            runs.append((output.read_text().splitlines(), rows))
+    finally:
+        server.terminate()
+        server.join()
+    (first, first_rows), (second, second_rows) = runs
+    assert len(first) == first_rows
+    # Replayed findings appear once, next to the ones the resumed run added.
+    assert sorted(set(second)) == sorted(second)
+    assert set(first) <= set(second)
+    assert [json.loads(line)['check'] for line in set(second) - set(first)] == ['debug-log', 'debug-log']
+    assert len(second) == second_rows
+
+def test_http_cache_revalidates_on_a_second_run(tmp_path):
+    path = str(tmp_path / 'http.db')
+
+    async def main():
+        runs = []
+        async with serve(MockSite(etags=True).app()) as url, wp.Transport(rate=1000) as transport:
+            for _ in range(2):
+                cache, sink = wp.HttpCache(path), ListSink()
+                await wp.AsyncWordPressScanner(url, 'test', transport, reporter=wp.Reporter([sink]), http_cache=cache).scan(['robots-text'])
+                cache.close()
+                runs.append((cache.revalidated, [finding.data['entry'] for finding in sink.kinds('robots-entry')]))
+        return runs
+
+    first, second = asyncio.run(main())
+    assert first[0] == 0 and second[0] >= 1
+    assert first[1] == second[1] == ['Disallow: /wp-admin/']
+
+def test_streamed_bodies_past_the_cache_entry_size_are_not_buffered(tmp_path):
+    class RecordingCache(wp.HttpCache):
+        stored = []
+
+        def store(self, url, headers, body):
+            self.stored.append((url, len(body)))
+            super().store(url, headers, body)
+
+    async def main(http_cache):
+        async with serve(MockSite(etags=True).app()) as url, wp.Transport(rate=1000) as transport:
+            scanner = wp.AsyncWordPressScanner(url, 'test', transport, reporter=wp.Reporter(), http_cache=http_cache)
+            chunks = []
+            await scanner.request(f'{url}/debug.log', on_chunk=lambda chunk: chunks.append(len(chunk)))
+            await scanner.request(f'{url}/robots.txt', on_chunk=lambda chunk: None)
+            return url, sum(chunks)
+
+    http_cache = RecordingCache(str(tmp_path / 'cache.db'), max_entry=64 << 10)
+    url, streamed = asyncio.run(main(http_cache))
+    http_cache.close()
+    assert streamed == 1 << 20
+    assert [stored_url for stored_url, size in http_cache.stored] == [f'{url}/robots.txt']
+
+def test_soft_404_probes_only_report_real_files():
+    scanner, sink = asyncio.run(scan(MockSite(soft_404=True).app(), ['readme', 'backup-file', 'debug-log']))
+    assert [finding.data['url'].rsplit('/', 1)[1] for finding in sink.kinds('backup-file')] == ['wp-config.php.bak']
+    assert len(sink.kinds('debug-log')) == 2
+    assert sink.kinds('readme')
+
+def test_page_signature_matches_near_identical_pages():
+    def signature(body, status=200):
+        return wp.PageSignature(wp.CapturedResponse('http://a/', status, {}, body))
+
+    # A themed 404 that echoes the requested path, long enough for a stable hash.
+    page = '<html><h1>Not found: {}</h1>' + ' '.join(f'word{n % 60}' for n in range(600)) + '</html>'
+    missing = signature(page.format('/wp-config.php.bak').encode())
+    assert missing.matches(signature(page.format('/debug.log').encode()))
+    assert not missing.matches(signature(page.format('/debug.log').encode(), status=404))
+    assert not missing.matches(signature(b'<?php define("DB_NAME", "wordpress"); define("DB_USER", "root"); ' * 20))
+
+def test_page_signature_hashes_only_when_status_and_length_match(monkeypatch):
+    hashed = []
+    monkeypatch.setattr(wp, 'simhash', lambda data: hashed.append(data) or 0)
+
+    def signature(body, status=200):
+        return wp.PageSignature(wp.CapturedResponse('http://a/', status, {}, body))
+
+    missing = signature(b'x' * 1000)
+    assert not missing.matches(signature(b'x' * 1000, status=404))
+    assert not missing.matches(signature(b'x' * 100000))
+    assert hashed == []
+    assert missing.matches(signature(b'y' * 1000))
+    assert missing.matches(signature(b'z' * 1000))
+    assert len(hashed) == 3
+
+def users_site(log, users=250, api=True, listed=None, total_pages=None):
+    # REST users served 100 a page with X-WP-TotalPages, and ?author=N
+    # redirects for the same users. `listed` caps what the REST API shows.
+    listed = users if listed is None else listed
+
+    async def handle(request):
+        log.append(request.path_qs)
+        if request.path == '/wp-json/wp/v2/users':
+            if not api:
+                return web.json_response({'code': 'rest_user_cannot_view'}, status=401)
+            page = int(request.query.get('page', 1))
+            found = [{'id': n, 'name': f'User {n}', 'slug': f'user{n}'} for n in range((page - 1) * 100 + 1, min(listed, page * 100) + 1)]
+            return web.json_response(found, headers={'X-WP-TotalPages': str(total_pages or -(-listed // 100))})
+        if request.path == '/' and 'author' in request.query:
+            author = int(request.query['author'])
+            if 1 <= author <= users:
+                raise web.HTTPMovedPermanently(f'/author/user{author}/')
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    return app
+
+def test_user_enumeration_reads_every_rest_page():
+    log = []
+    scanner, sink = asyncio.run(scan(users_site(log), ['enum-users'], gate=False))
+    assert scanner.users == [f'user{n}' for n in range(1, 251)]
+    assert len(sink.kinds('user')) == 250
+    assert sorted(path for path in log if path.startswith('/wp-json/')) == \
+        [f'/wp-json/wp/v2/users?per_page=100&page={page}' for page in (1, 2, 3)]
+    assert not [path for path in log if 'author=' in path]
+
+def test_user_enumeration_falls_back_to_author_probes():
+    log = []
+    scanner, sink = asyncio.run(scan(users_site(log, users=25, api=False), ['enum-users'], gate=False))
+    assert sorted(scanner.users, key=lambda slug: int(slug[4:])) == [f'user{n}' for n in range(1, 26)]
+    authors = [int(path.split('=')[1]) for path in log if 'author=' in path]
+    assert max(authors) <= 25 + 20 + 10
+
+def test_user_enumeration_falls_back_when_rest_lists_no_users():
+    log = []
+    scanner, sink = asyncio.run(scan(users_site(log, users=5, listed=0), ['enum-users'], gate=False))
+    assert sorted(scanner.users) == [f'user{n}' for n in range(1, 6)]
+    assert [path for path in log if path.startswith('/wp-json/')] == ['/wp-json/wp/v2/users?per_page=100&page=1']
+
+def test_user_enumeration_caps_the_advertised_page_count():
+    log = []
+    scanner, sink = asyncio.run(scan(users_site(log, users=150, total_pages=10 ** 9), ['enum-users'], gate=False))
+    assert len(scanner.users) == 150
+    assert len([path for path in log if path.startswith('/wp-json/')]) == 100
+
+def test_gate_skips_checks_on_non_wordpress_hosts():
+    scanner, sink = asyncio.run(scan(not_wordpress(), ['readme', 'debug-log']))
+    assert sink.findings == []
+
+def test_sharded_fleet_reports_the_same_findings_as_one_process(tmp_path):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = multiprocessing.Process(target=serve_process, args=(MockSite(), '127.0.0.1', port), daemon=True)
+    server.start()
+    try:
+        wait_for_port('127.0.0.1', port)
+        targets = tmp_path / 'targets.txt'
+        targets.write_text(''.join(f'http://{host}:{port}\n' for host in ('127.0.0.1', 'localhost')))
+        findings = {}
+        for processes in (1, 2):
+            output = tmp_path / f'{processes}.jsonl'
+            result = subprocess.run([sys.executable, SCRIPT, '--targets', str(targets), '--processes', str(processes),
+                                     '--checks', 'readme,robots-text', '--quiet', '--output', str(output)],
+                                    capture_output=True, text=True, timeout=120)
+            assert result.returncode == 0, result.stderr
+            findings[processes] = sorted(output.read_text().splitlines())
+    finally:
+        server.terminate()
+        server.join()
+    assert findings[1] == findings[2]
+    assert {json.loads(line)['target'] for line in findings[2]} == {f'http://{host}:{port}' for host in ('127.0.0.1', 'localhost')}
+
+def test_shards_sharing_an_http_cache_keep_one_size_budget(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    shards = [wp.HttpCache(path, max_bytes=10000), wp.HttpCache(path, max_bytes=10000)]
+    headers = wp.CIMultiDict({'ETag': '"x"'})
+    for n in range(20):
+        shards[n % 2].save(f'http://host{n % 2}/{n}', headers, b'x' * 1000)
+    db = sqlite3.connect(path)
+    total = db.execute('SELECT SUM(size) FROM responses').fetchone()[0]
+    assert total <= 10000
+    assert db.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()[0] == total
+    for shard in shards:
+        shard.close()
+
+def test_sharded_fleet_merges_shard_profiles(tmp_path):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = multiprocessing.Process(target=serve_process, args=(MockSite(), '127.0.0.1', port), daemon=True)
+    server.start()
+    try:
+        wait_for_port('127.0.0.1', port)
+        targets = tmp_path / 'targets.txt'
+        targets.write_text(f'http://127.0.0.1:{port}\nhttp://localhost:{port}\n')
+        prefix = str(tmp_path / 'profile')
+        result = subprocess.run([sys.executable, SCRIPT, '--targets', str(targets), '--processes', '2', '--checks', 'readme',
+                                 '--quiet', '--profile', prefix], capture_output=True, text=True, timeout=120)
+    finally:
+        server.terminate()
+        server.join()
+    assert result.returncode == 0, result.stderr
+    assert sorted(os.listdir(tmp_path)) == ['profile.prom', 'profile.trace.json', 'targets.txt']
+    prometheus = open(f'{prefix}.prom').read()
+    assert f'host="127.0.0.1:{port}"' in prometheus and f'host="localhost:{port}"' in prometheus
+
+def test_listing_parser_apache_table_split_across_chunks():
+    page = (b'<table><tr><th><a href="?C=N;O=D">Name</a></th></tr>\n'
+            b'<tr><td><a href="/wp-content/">Parent Directory</a></td><td>&nbsp;</td><td align="right">  - </td></tr>\n'
+            b'<tr><td><a href="2023/">2023/</a></td><td align="right">2023-05-01 12:00  </td><td align="right">  - </td></tr>\n'
+            b'<tr><td><a href="backup.zip">backup.zip</a></td><td align="right">2023-05-01 12:00  </td><td align="right">1.5M</td></tr>\n')
+    entries = []
+    parser = wp.ListingParser(lambda href, mtime, size: entries.append((href, wp.listing_mtime(mtime), wp.listing_size(size))))
+    for start in range(0, len(page), 17):
+        parser.feed(page[start:start + 17])
+    parser.close()
+    assert entries == [('/wp-content/', None, None), ('2023/', '2023-05-01T12:00:00', None),
+                       ('backup.zip', '2023-05-01T12:00:00', 1572864)]
+
+def test_listing_parser_nginx_pre():
+    page = b'<pre><a href="../">../</a>\n<a href="db.sql">db.sql</a>                01-Jan-2024 10:00    12345\n</pre>'
+    entries = []
+    parser = wp.ListingParser(lambda href, mtime, size: entries.append((href, wp.listing_mtime(mtime), wp.listing_size(size))))
+    parser.feed(page)
+    parser.close()
+    assert entries == [('../', None, None), ('db.sql', '2024-01-01T10:00:00', 12345)]
+
+def listing_site(log):
+    # Open listings under wp-content/uploads/ (one level deep) and wp-includes/.
+    listings = {'/wp-content/uploads/': ['db.sql', 'sub/'], '/wp-content/uploads/sub/': ['photo.jpg'], '/wp-includes/': ['version.php']}
+
+    async def handle(request):
+        log.append(request.path)
+        entries = listings.get(request.path)
+        if entries is None:
+            return web.Response(status=404)
+        rows = ''.join(f'<a href="{entry}">{entry}</a>                01-Jan-2024 10:00    100\n' for entry in entries)
+        return web.Response(text=f'<html><title>Index of {request.path}</title><pre>{rows}</pre></html>', content_type='text/html')
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    return app
+
+def test_listing_inventory_walks_only_wp_content_listings():
+    log = []
+    scanner, sink = asyncio.run(scan(listing_site(log), ['directory-listing', 'listing-inventory'], gate=False))
+    assert sorted(finding.data['url'].split('/', 3)[3] for finding in sink.kinds('directory-listing')) == ['wp-content/uploads/', 'wp-includes/']
+    assert sorted((finding.check, finding.data['path']) for finding in sink.kinds('listing-entry')) == \
+        [('listing-inventory', 'wp-content/uploads/db.sql'), ('listing-inventory', 'wp-content/uploads/sub/photo.jpg')]
+    assert log.count('/wp-includes/') == 1
+
+def test_directory_listing_alone_does_not_inventory():
+    log = []
+    scanner, sink = asyncio.run(scan(listing_site(log), ['directory-listing'], gate=False))
+    assert len(sink.kinds('directory-listing')) == 2
+    assert sink.kinds('listing-entry') == []
+    assert '/wp-content/uploads/sub/' not in log
+
+def test_soft_404_host_is_not_taken_for_wordpress():
+    scanner, sink = asyncio.run(scan(catch_all(), ['wordpress', 'readme', 'xml-rpc'], gate=False))
+    assert sink.kinds('wordpress') == []
+    assert sink.kinds('readme') == []
+    assert sink.kinds('xml-rpc') == []
+
+def test_aggressive_plugin_probes_ignore_soft_404_pages():
+    site = MockSite(soft_404=True)
+    scanner, sink = asyncio.run(scan(site.app(), ['check-plugins'], plugin_mode='aggressive'))
+    installed = {plugin.split('/')[0] for plugin in site.plugins}
+    assert {finding.data['slug'] for finding in sink.kinds('plugin')} == installed
+    # Probed (not passively seen) plugins carry the readme's Stable tag.
+    assert all(finding.data['version'] for finding in sink.kinds('plugin'))
+
+def test_checks_fail_with_the_artifacts_they_consume(tmp_path):
+    async def main(jobs):
+        async with wp.Transport(rate=1000, max_backoff=0.01, breaker_threshold=100) as transport:
+            scanner = wp.AsyncWordPressScanner('http://127.0.0.1:1', 'test', transport, reporter=wp.Reporter(), jobs=jobs)
+            await scanner.scan(['robots-text'])
+
+    jobs = wp.JobStore(str(tmp_path / 'jobs.db'))
+    asyncio.run(main(jobs))
+    jobs.close()
+    statuses = dict(sqlite3.connect(str(tmp_path / 'jobs.db')).execute('SELECT "check", status FROM jobs'))
+    assert statuses == {'robots-text': 'failed', 'robots': 'failed'}
@@ -1,10 +1,20 @@
-import re, json, argparse, asyncio, aiohttp, colorama, warnings
+import io, os, re, ssl, sys, gzip, json, math, time, zlib, random, sqlite3, tarfile, zipfile, hashlib, argparse, asyncio, aiohttp, colorama, threading, contextlib, contextvars, multiprocessing
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from queue import Empty, Full
+from urllib.parse import unquote, urljoin, urlsplit
 from aiohttp import ClientConnectionError
-from bs4 import BeautifulSoup
+from multidict import CIMultiDict, CIMultiDictProxy
 from lxml import etree
 from colorama import Fore, Style
 
-warnings.filterwarnings("ignore", category=UserWarning, module='bs4')
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 colorama.init(autoreset=True)
 
 class Code_Color:
@@ -13,48 +23,1788 @@ class Code_Color:
     error = f"{Fore.RED}[-]{Style.RESET_ALL}"        # Error
     critical = f"{Fore.RED}[!]{Style.RESET_ALL}"     # Critical error
 
+class RequestLimiter:
+    # Caps requests in flight globally and per host. Host entries are dropped
+    # as soon as they go idle so memory does not grow with the target list.
+
+    def __init__(self, total=100, per_host=6):
+        self.total = asyncio.Semaphore(total)
+        self.per_host = per_host
+        self.hosts = {}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url):
+        host = urlsplit(url).netloc
+        entry = self.hosts.get(host)
+        if entry is None:
+            entry = self.hosts[host] = [asyncio.Semaphore(self.per_host), 0]
+        entry[1] += 1
+        try:
+            async with entry[0], self.total:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.hosts[host]
+
+class HostUnavailable(Exception):
+    pass
+
+class HostState:
+    # Adaptive token bucket plus circuit breaker for one host. The rate is
+    # halved whenever the host pushes back (429/503) and creeps back up on
+    # every success; repeated connect failures or timeouts open the breaker.
+    __slots__ = ('rate', 'max_rate', 'burst', 'tokens', 'updated', 'blocked_until', 'failures', 'open_until')
+
+    def __init__(self, rate, burst):
+        self.rate = self.max_rate = rate
+        self.burst = self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.failures = 0
+        self.open_until = 0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def available(self):
+        return time.monotonic() >= self.open_until
+
+    def throttle(self, delay=None):
+        self.rate = max(self.max_rate / 32, self.rate / 2)
+        if delay:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+    def success(self):
+        self.failures = 0
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def failure(self, threshold, cooldown):
+        self.failures += 1
+        if self.failures >= threshold:
+            self.open_until = time.monotonic() + cooldown
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class Transport:
+    # The single connection pool shared by every scanner. Checks never see a
+    # session; they go through AsyncWordPressScanner.fetch, which ends here.
+
+    def __init__(self, limiter=None, pool_size=100, pool_per_host=6, keepalive=30, dns_ttl=300, timeout=20,
+                 rate=20, breaker_threshold=5, breaker_cooldown=60, max_backoff=30, max_body=1 << 20, profiler=None):
+        self.limiter = limiter or RequestLimiter(pool_size, pool_per_host)
+        self.profiler = profiler
+        self.max_body = max_body
+        self.rate = rate
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.max_backoff = max_backoff
+        self.hosts = OrderedDict()
+        self.pool_size = pool_size
+        self.pool_per_host = pool_per_host
+        self.keepalive = keepalive
+        self.dns_ttl = dns_ttl
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        # One context for every connection so TLS setup is done once and
+        # kept-alive sockets are reused instead of re-handshaking.
+        self.ssl_context = ssl.create_default_context()
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_per_host,
+            keepalive_timeout=self.keepalive,
+            ttl_dns_cache=self.dns_ttl,
+            use_dns_cache=True,
+            ssl=self.ssl_context,
+        )
+        # Tracing is only hooked in when profiling, so a normal scan pays nothing for it.
+        trace_configs = [self.profiler.trace_config()] if self.profiler else None
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, trace_configs=trace_configs)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+
+    def host_state(self, url):
+        host = urlsplit(url).netloc
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(self.rate, max(1, self.rate))
+            if len(self.hosts) > 4096:
+                self.hosts.popitem(last=False)
+        else:
+            self.hosts.move_to_end(host)
+        return state
+
+    def backoff(self, attempt, retry_after=None):
+        # Exponential backoff with full jitter. A Retry-After longer than the
+        # cap means the URL is given up rather than held for minutes.
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            return delay if delay <= self.max_backoff else None
+        return random.uniform(0, min(self.max_backoff, 0.5 * 2 ** attempt))
+
+    @contextlib.asynccontextmanager
+    async def request(self, method, url, headers=None, allow_redirects=True, attempt=0):
+        state = self.host_state(url)
+        if not state.available():
+            raise HostUnavailable(f'circuit open for {urlsplit(url).netloc}')
+        span = self.profiler.span(method, url, attempt) if self.profiler else None
+        await state.acquire()
+
+        try:
+            async with self.limiter.slot(url), self.session.request(method, url, headers=headers, allow_redirects=allow_redirects,
+                                                                    trace_request_ctx=span) as response:
+                if response.status in (429, 503):
+                    state.throttle(parse_retry_after(response.headers.get('Retry-After')))
+                else:
+                    state.success()
+                if span is not None:
+                    span.status = response.status
+                try:
+                    yield response
+                finally:
+                    if span is not None:
+                        # Bodies are streamed, which the chunk trace hook does not see.
+                        span.bytes_in = response.content.total_bytes
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+            state.failure(self.breaker_threshold, self.breaker_cooldown)
+            if span is not None:
+                span.error = type(e).__name__
+            raise
+        finally:
+            if span is not None:
+                self.profiler.finish(span)
+
+class Span:
+    # Timings of one HTTP attempt, in perf_counter seconds. The phase fields
+    # are filled in by the TraceConfig hooks as aiohttp reaches them.
+    __slots__ = ('check', 'host', 'method', 'url', 'attempt', 'status', 'error', 'reused', 'mark', 'start', 'sent',
+                 'headers_sent', 'first_byte', 'end', 'queued', 'dns', 'connect', 'bytes_out', 'bytes_in')
+
+    def __init__(self, check, host, method, url, attempt):
+        self.check = check
+        self.host = host
+        self.method = method
+        self.url = url
+        self.attempt = attempt
+        self.status = None
+        self.error = None
+        self.reused = False
+        self.start = self.mark = time.perf_counter()
+        self.sent = self.headers_sent = self.first_byte = self.end = None
+        self.queued = self.dns = self.connect = 0.0
+        self.bytes_out = self.bytes_in = 0
+
+    def phases(self):
+        # Consecutive phases: waiting for a rate/limiter slot, for a pooled
+        # connection, DNS, TCP connect (TLS included: aiohttp has no separate
+        # handshake hook), server time to first byte, then the body read.
+        sent = self.sent or self.end
+        headers_sent = self.headers_sent or sent
+        first_byte = self.first_byte or self.end
+        return (('wait', sent - self.start), ('queue', self.queued), ('dns', self.dns), ('connect', self.connect),
+                ('ttfb', max(0.0, first_byte - headers_sent)), ('body', self.end - first_byte))
+
+class Profiler:
+    # Collects a Span per request and a wall time per check, grouped by
+    # (check, host), and exports them as a console table, Prometheus text
+    # and a Chrome trace. Spans kept for the trace are capped; the
+    # aggregates are not.
+    PHASES = ('wait', 'queue', 'dns', 'connect', 'ttfb', 'body')
+
+    def __init__(self, max_spans=200000):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.max_spans = max_spans
+        self.checks = []
+        self.stats = {}
+
+    def span(self, method, url, attempt):
+        return Span(CURRENT_CHECK.get(), urlsplit(url).netloc, method, url, attempt)
+
+    def finish(self, span):
+        span.end = time.perf_counter()
+        stats = self.stats.get((span.check, span.host))
+        if stats is None:
+            stats = self.stats[span.check, span.host] = {'requests': 0, 'retries': 0, 'errors': 0, 'bytes_in': 0, 'bytes_out': 0,
+                                                          'durations': [], **{phase: 0.0 for phase in self.PHASES}}
+        stats['requests'] += 1
+        stats['retries'] += span.attempt > 0
+        stats['errors'] += span.error is not None
+        stats['bytes_in'] += span.bytes_in
+        stats['bytes_out'] += span.bytes_out
+        stats['durations'].append(span.end - span.start)
+        for phase, seconds in span.phases():
+            stats[phase] += seconds
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+
+    def merge(self, other):
+        # Folds in the profile of a shard process. perf_counter is the
+        # system-wide monotonic clock, so all shards share one timeline.
+        self.origin = min(self.origin, other.origin)
+        for key, stats in other.stats.items():
+            mine = self.stats.get(key)
+            if mine is None:
+                self.stats[key] = stats
+            else:
+                for name, value in stats.items():
+                    mine[name] += value
+        self.checks += other.checks
+        self.spans += other.spans[:max(0, self.max_spans - len(self.spans))]
+
+    def export(self, prefix):
+        print(self.summary(), file=sys.stderr)
+        self.write_prometheus(f'{prefix}.prom')
+        self.write_chrome_trace(f'{prefix}.trace.json')
+        print(f'{Code_Color.ok} Profile written to {prefix}.prom and {prefix}.trace.json', file=sys.stderr)
+
+    def check_done(self, target, check, start):
+        self.checks.append((urlsplit(target).netloc, check, start, time.perf_counter()))
+
+    def trace_config(self):
+        def hook(callback):
+            async def on_event(session, context, params):
+                if context.trace_request_ctx is not None:
+                    callback(context.trace_request_ctx, params)
+            return on_event
+
+        def add(field):
+            # Pairs a *_start hook with its *_end hook. Pool queueing, DNS and
+            # connect never overlap within one request, so one mark suffices.
+            def start(span, params):
+                span.mark = time.perf_counter()
+
+            def end(span, params):
+                setattr(span, field, getattr(span, field) + time.perf_counter() - span.mark)
+            return hook(start), hook(end)
+
+        config = aiohttp.TraceConfig()
+        for field, (on_start, on_end) in (('queued', (config.on_connection_queued_start, config.on_connection_queued_end)),
+                                          ('dns', (config.on_dns_resolvehost_start, config.on_dns_resolvehost_end)),
+                                          ('connect', (config.on_connection_create_start, config.on_connection_create_end))):
+            start, end = add(field)
+            on_start.append(start)
+            on_end.append(end)
+
+        def request_start(span, params):
+            span.sent = time.perf_counter()
+
+        def headers_sent(span, params):
+            span.headers_sent = time.perf_counter()
+            span.bytes_out += sum(len(name) + len(value) + 4 for name, value in params.headers.items()) + len(params.url.raw_path_qs) + 16
+
+        def chunk_sent(span, params):
+            span.bytes_out += len(params.chunk)
+
+        def request_end(span, params):
+            span.first_byte = time.perf_counter()
+
+        def reused(span, params):
+            span.reused = True
+
+        def exception(span, params):
+            span.error = type(params.exception).__name__
+
+        config.on_request_start.append(hook(request_start))
+        config.on_request_headers_sent.append(hook(headers_sent))
+        config.on_request_chunk_sent.append(hook(chunk_sent))
+        config.on_request_end.append(hook(request_end))
+        config.on_connection_reuseconn.append(hook(reused))
+        config.on_request_exception.append(hook(exception))
+        return config
+
+    def by_check(self):
+        grouped = {}
+        for (check, host), stats in self.stats.items():
+            total = grouped.setdefault(check or '-', {'durations': []})
+            for key, value in stats.items():
+                if key == 'durations':
+                    total['durations'] += value
+                else:
+                    total[key] = total.get(key, 0) + value
+        return grouped
+
+    def summary(self):
+        def percentile(values, fraction):
+            return values[min(len(values) - 1, int(fraction * len(values)))] * 1000 if values else 0.0
+
+        wall = {}
+        for host, check, start, end in self.checks:
+            wall[check] = max(wall.get(check, 0.0), end - start)
+
+        lines = [f'{"check":<22}{"reqs":>7}{"retry":>7}{"err":>6}{"wall s":>9}{"p50 ms":>9}{"p95 ms":>9}'
+                 + ''.join(f'{phase + " ms":>11}' for phase in self.PHASES) + f'{"in KB":>10}{"out KB":>9}']
+        for check, stats in sorted(self.by_check().items(), key=lambda item: -sum(item[1]['durations'])):
+            durations = sorted(stats['durations'])
+            count = len(durations)
+            lines.append(f'{check:<22}{count:>7}{stats["retries"]:>7}{stats["errors"]:>6}{wall.get(check, 0.0):>9.2f}'
+                         f'{percentile(durations, 0.5):>9.1f}{percentile(durations, 0.95):>9.1f}'
+                         + ''.join(f'{stats[phase] / count * 1000:>11.1f}' for phase in self.PHASES)
+                         + f'{stats["bytes_in"] / 1024:>10.0f}{stats["bytes_out"] / 1024:>9.0f}')
+        lines.append('phase columns are means per request')
+        return '\n'.join(lines)
+
+    def write_prometheus(self, path):
+        def labels(**values):
+            return '{' + ','.join(f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                                  for key, value in values.items()) + '}'
+
+        metrics = [('wpscan_requests_total', 'counter', 'HTTP attempts sent, retries included.', 'requests'),
+                   ('wpscan_retries_total', 'counter', 'HTTP attempts that were retries.', 'retries'),
+                   ('wpscan_errors_total', 'counter', 'HTTP attempts that failed with a connection error or timeout.', 'errors'),
+                   ('wpscan_received_bytes_total', 'counter', 'Response body bytes received.', 'bytes_in'),
+                   ('wpscan_sent_bytes_total', 'counter', 'Request bytes sent (approximate for headers).', 'bytes_out')]
+        lines = []
+        for name, kind, help, key in metrics:
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+            lines += [f'{name}{labels(check=check or "", host=host)} {stats[key]}' for (check, host), stats in self.stats.items()]
+
+        lines += ['# HELP wpscan_request_duration_seconds Wall time of HTTP attempts.', '# TYPE wpscan_request_duration_seconds summary']
+        for (check, host), stats in self.stats.items():
+            durations = sorted(stats['durations'])
+            for quantile in (0.5, 0.95, 0.99):
+                value = durations[min(len(durations) - 1, int(quantile * len(durations)))]
+                lines.append(f'wpscan_request_duration_seconds{labels(check=check or "", host=host, quantile=quantile)} {value:.6f}')
+            lines.append(f'wpscan_request_duration_seconds_sum{labels(check=check or "", host=host)} {sum(durations):.6f}')
+            lines.append(f'wpscan_request_duration_seconds_count{labels(check=check or "", host=host)} {len(durations)}')
+
+        lines += ['# HELP wpscan_request_phase_seconds_total Time spent in each request phase.', '# TYPE wpscan_request_phase_seconds_total counter']
+        lines += [f'wpscan_request_phase_seconds_total{labels(check=check or "", host=host, phase=phase)} {stats[phase]:.6f}'
+                  for (check, host), stats in self.stats.items() for phase in self.PHASES]
+
+        lines += ['# HELP wpscan_check_duration_seconds Wall time of each check.', '# TYPE wpscan_check_duration_seconds gauge']
+        lines += [f'wpscan_check_duration_seconds{labels(check=check, host=host)} {end - start:.6f}' for host, check, start, end in self.checks]
+
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def write_chrome_trace(self, path):
+        # One process per host, one thread per check. Checks are complete
+        # events; requests overlap, so they and their phases are async events.
+        def micros(seconds):
+            return round((seconds - self.origin) * 1e6, 1)
+
+        pids, tids, events = {}, {}, []
+
+        def ids(host, check):
+            pid = pids.setdefault(host, len(pids) + 1)
+            if (host, check) not in tids:
+                tids[host, check] = len(tids) + 1
+                events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tids[host, check], 'args': {'name': check or '-'}})
+            return pid, tids[host, check]
+
+        for host, check, start, end in self.checks:
+            pid, tid = ids(host, check)
+            events.append({'ph': 'X', 'cat': 'check', 'name': check, 'pid': pid, 'tid': tid, 'ts': micros(start), 'dur': round((end - start) * 1e6, 1)})
+
+        for number, span in enumerate(self.spans):
+            pid, tid = ids(span.host, span.check)
+            common = {'cat': 'request', 'id': number, 'pid': pid, 'tid': tid}
+            events.append({'ph': 'b', 'name': f'{span.method} {span.url}', 'ts': micros(span.start), **common,
+                           'args': {'status': span.status, 'attempt': span.attempt, 'error': span.error, 'reused': span.reused,
+                                    'bytes_in': span.bytes_in, 'bytes_out': span.bytes_out}})
+            at = span.start
+            for phase, seconds in span.phases():
+                if seconds > 0:
+                    events.append({'ph': 'b', 'name': phase, 'ts': micros(at), **common})
+                    events.append({'ph': 'e', 'name': phase, 'ts': micros(at + seconds), **common})
+                    at += seconds
+            events.append({'ph': 'e', 'name': f'{span.method} {span.url}', 'ts': micros(span.end), **common})
+
+        events += [{'ph': 'M', 'name': 'process_name', 'pid': pid, 'args': {'name': host}} for host, pid in pids.items()]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, separators=(',', ':'))
+
+INDEX_OF = re.compile(rb'Index of')
+# PHP prints "Fatal error:" as plain text or, with html_errors, as "<b>Fatal error</b>:";
+# the first file named on that line is the exposed path.
+FATAL_ERROR = re.compile(rb'Fatal error(?:</b>)?:[^\n]*? in (?:<b>)?([^\s<>]+?\.php)')
+AUTHOR_PATH = re.compile(r'/author/([^/?#]+)')
+STABLE_TAG = re.compile(rb'Stable tag:\s*([0-9][0-9A-Za-z._-]*)', re.I)
+PLUGIN_PATH = re.compile(rb'wp-content/plugins/([A-Za-z0-9_.-]+)/[^"\'\s<>?#]*(?:\?(?:[^"\'\s<>#]*&(?:amp;)?)?ver=([0-9][0-9A-Za-z._-]*))?')
+
+FINGERPRINT = re.compile(rb'''
+      <meta\s+name=["']generator["']\s+content=["']WordPress\s+(?P<generator>[0-9][0-9.]*)
+    | <generator>https?://wordpress\.org/\?v=(?P<feed_generator>[0-9][0-9.]*)</generator>
+    | wp-includes\\?/(?:css\\?/dist|css\\?/dashicons|js\\?/wp-emoji)[^"'\s<>?#]*\?(?:[^"'\s<>#]*?&(?:amp;)?)?ver=(?P<core_asset>[0-9][0-9.]*)
+    | (?P<core_path>wp-(?:includes|admin)/)
+    | wp-content/themes/(?P<theme>[A-Za-z0-9_.-]+)/(?:[^"'\s<>?#]*\?(?:[^"'\s<>#]*?&(?:amp;)?)?ver=(?P<theme_version>[0-9][0-9A-Za-z._-]*))?
+    | wp-content/plugins/(?P<plugin>[A-Za-z0-9_.-]+)/(?:[^"'\s<>?#]*\?(?:[^"'\s<>#]*?&(?:amp;)?)?ver=(?P<plugin_version>[0-9][0-9A-Za-z._-]*))?
+    | rel=["']https://api\.w\.org/["']\s+href=["'](?P<rest_api>[^"']+)
+    | rel=["']pingback["']\s+href=["'](?P<pingback>[^"']+)
+    | (?P<xmlrpc>xmlrpc\.php)
+''', re.X | re.I)
+
+class Fingerprint:
+    # Everything the homepage and feed give away, collected by one pass of
+    # the FINGERPRINT alternation over each body. Only core assets that are
+    # versioned with WordPress itself (block styles, dashicons, emoji) count
+    # towards the version; bundled libraries such as jQuery carry their own.
+    __slots__ = ('generator', 'core_assets', 'core_paths', 'themes', 'plugins', 'rest_api', 'pingback', 'xmlrpc')
+
+    def __init__(self):
+        self.generator = None
+        self.core_assets = Counter()
+        self.core_paths = False
+        self.themes = {}
+        self.plugins = {}
+        self.rest_api = None
+        self.pingback = None
+        self.xmlrpc = False
+
+    def feed(self, body):
+        for match in FINGERPRINT.finditer(body):
+            kind = match.lastgroup
+            if kind in ('generator', 'feed_generator'):
+                self.generator = self.generator or match.group(kind).decode()
+            elif kind == 'core_asset':
+                self.core_assets[match.group(kind).decode()] += 1
+            elif kind == 'core_path':
+                self.core_paths = True
+            elif kind in ('theme', 'theme_version', 'plugin', 'plugin_version'):
+                found = self.themes if kind.startswith('theme') else self.plugins
+                slug = match.group(kind.split('_')[0]).decode()
+                version = match.group(kind) if kind.endswith('_version') else None
+                if found.get(slug) is None:
+                    found[slug] = version.decode() if version else None
+            elif kind == 'rest_api':
+                self.rest_api = self.rest_api or match.group(kind).decode()
+            elif kind == 'pingback':
+                self.pingback = self.pingback or match.group(kind).decode()
+                self.xmlrpc = True
+            elif kind == 'xmlrpc':
+                self.xmlrpc = True
+
+    @property
+    def version(self):
+        if self.generator:
+            return self.generator
+        if self.core_assets:
+            return self.core_assets.most_common(1)[0][0]
+        return None
+
+    @property
+    def is_wordpress(self):
+        return bool(self.generator or self.themes or self.plugins or self.rest_api or self.core_assets or self.core_paths)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+async def bounded_map(func, items, concurrency):
+    # Applies func to every item with at most `concurrency` calls in flight.
+    # Items are pulled lazily from one shared iterator, so a 50k wordlist
+    # never turns into 50k pending tasks. Results keep the input order.
+    items = enumerate(items)
+    results = []
+
+    async def worker():
+        for index, item in items:
+            results.append((index, item, await func(item)))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    results.sort(key=lambda result: result[0])
+    return [(item, result) for index, item, result in results]
+
+def version_key(version):
+    # Sortable text key for a version string: numeric components are
+    # zero-padded and trailing zeros dropped, so 6.4 == 6.4.0 < 6.4.2 < 6.10
+    # compare correctly as plain strings (and therefore inside SQLite).
+    parts = []
+    for part in re.split(r'[.\-_+ ]', str(version).strip().lstrip('vV')):
+        if not part.isdigit():
+            break
+        parts.append(part[-8:].zfill(8))
+    while parts and not parts[-1].strip('0'):
+        parts.pop()
+    return '.'.join(parts) if parts else None
+
+class VulnerabilityIndex:
+    # Offline vulnerability lookups. A feed is compiled once into SQLite with
+    # every affected range stored as pre-parsed version keys, so answering
+    # (kind, slug, version) is one indexed query with no version parsing.
+    LOWEST, HIGHEST = '', '~'
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        self.memo = {}
+
+    @classmethod
+    def build(cls, feed_path, path):
+        records = 0
+        tmp_path = path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        db = sqlite3.connect(tmp_path)
+        db.executescript('''
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE vulnerabilities (id INTEGER PRIMARY KEY, ref TEXT, title TEXT, cve TEXT, cvss REAL);
+            CREATE TABLE ranges (kind TEXT, slug TEXT, from_key TEXT, from_inclusive INTEGER,
+                                 to_key TEXT, to_inclusive INTEGER, vulnerability INTEGER);
+        ''')
+        for record in cls.read_feed(feed_path):
+            cvss = record.get('cvss')
+            cursor = db.execute('INSERT INTO vulnerabilities (ref, title, cve, cvss) VALUES (?, ?, ?, ?)',
+                                (record.get('id'), record.get('title'), record.get('cve'),
+                                 cvss.get('score') if isinstance(cvss, dict) else cvss))
+            rows = []
+            for software in record.get('software') or []:
+                kind = software.get('type')
+                slug = 'wordpress' if kind == 'core' else software.get('slug')
+                for affected in (software.get('affected_versions') or {}).values():
+                    from_key = version_key(affected.get('from_version', '*')) or cls.LOWEST
+                    to_key = version_key(affected.get('to_version', '*')) or cls.HIGHEST
+                    rows.append((kind, slug, from_key, int(affected.get('from_inclusive', True)),
+                                 to_key, int(affected.get('to_inclusive', True)), cursor.lastrowid))
+            db.executemany('INSERT INTO ranges VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            records += 1
+        db.execute('CREATE INDEX ranges_slug ON ranges (kind, slug, from_key)')
+        db.commit()
+        db.execute('VACUUM')
+        db.close()
+        os.replace(tmp_path, path)
+        return records
+
+    @staticmethod
+    def read_feed(feed_path):
+        # Wordfence Intelligence style records: a JSON object keyed by id, a
+        # JSON list, or JSON Lines with one record per line.
+        with open(feed_path, encoding='utf-8') as f:
+            first = f.read(1)
+            while first.isspace():
+                first = f.read(1)
+            f.seek(0)
+            if first == '[':
+                yield from json.load(f)
+                return
+            try:
+                feed = json.load(f)
+            except json.JSONDecodeError:
+                f.seek(0)
+                feed = None
+            if isinstance(feed, dict):
+                for ref, record in feed.items():
+                    record.setdefault('id', ref)
+                    yield record
+                return
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def lookup(self, kind, slug, version):
+        key = version_key(version) if version else None
+        if key is None:
+            return []
+        memo_key = (kind, slug, key)
+        if memo_key not in self.memo:
+            if len(self.memo) > 65536:
+                self.memo.clear()
+            self.memo[memo_key] = self.db.execute('''
+                SELECT v.ref, v.title, v.cve, v.cvss FROM ranges r JOIN vulnerabilities v ON v.id = r.vulnerability
+                WHERE r.kind = ? AND r.slug = ?
+                  AND (r.from_key < ? OR (r.from_inclusive AND r.from_key = ?))
+                  AND (r.to_key > ? OR (r.to_inclusive AND r.to_key = ?))
+            ''', (kind, slug, key, key, key, key)).fetchall()
+        return self.memo[memo_key]
+
+class HashIndex:
+    # md5 of WordPress core static files per release. At scan time the next
+    # file to fetch is the one whose hashes split the remaining candidate
+    # versions most evenly, so a version is pinned in a handful of requests.
+    STATIC_PREFIXES = ('wp-includes/js/', 'wp-includes/css/', 'wp-admin/js/', 'wp-admin/css/')
+    loaded = {}
+
+    def __init__(self, versions, files):
+        self.versions = versions
+        self.files = files
+
+    @classmethod
+    def load(cls, path):
+        index = cls.loaded.get(path)
+        if index is None:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            files = {}
+            for name, hashes in data['files'].items():
+                files[name] = {version: digest for digest, versions in hashes.items() for version in versions}
+            index = cls.loaded[path] = cls(data['versions'], files)
+        return index
+
+    @staticmethod
+    def read_release(path):
+        # Yields (path inside the release, content) for a zip, a tarball or an
+        # unpacked directory; the leading wordpress/ component is stripped.
+        def relative(name):
+            parts = name.replace('\\', '/').split('/', 1)
+            return parts[1] if len(parts) == 2 and parts[0] == 'wordpress' else name
+
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        yield relative(info.filename), archive.read(info)
+        elif os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                for name in names:
+                    full = os.path.join(root, name)
+                    with open(full, 'rb') as f:
+                        yield relative(os.path.relpath(full, path)), f.read()
+        elif tarfile.is_tarfile(path):
+            with tarfile.open(path) as archive:
+                for member in archive:
+                    if member.isfile():
+                        yield relative(member.name), archive.extractfile(member).read()
+
+    @classmethod
+    def build(cls, source, path):
+        releases = {}
+        for name in sorted(os.listdir(source)):
+            version, hashes = None, {}
+            for member, content in cls.read_release(os.path.join(source, name)):
+                if member == 'wp-includes/version.php':
+                    match = re.search(rb"\$wp_version\s*=\s*'([^']+)'", content)
+                    version = match.group(1).decode() if match else None
+                elif member.startswith(cls.STATIC_PREFIXES) and member.endswith(('.js', '.css')):
+                    hashes[member] = hashlib.md5(content).hexdigest()
+            if not version:
+                print(f'{Code_Color.error} Skipped {name}: no wp-includes/version.php found')
+            elif not hashes:
+                print(f'{Code_Color.error} Skipped {name}: no static files found for WordPress {version}')
+            else:
+                releases[version] = hashes
+                print(f'{Code_Color.info} Hashed {len(hashes)} static files of WordPress {version}')
+
+        versions = sorted(releases, key=version_key)
+        files = {}
+        for index, version in enumerate(versions):
+            for member, digest in releases[version].items():
+                files.setdefault(member, {}).setdefault(digest, []).append(index)
+        # A file with one hash present in every release cannot split anything.
+        files = {member: hashes for member, hashes in files.items()
+                 if len(hashes) > 1 or len(next(iter(hashes.values()))) < len(versions)}
+
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump({'versions': versions, 'files': files}, f, separators=(',', ':'))
+        return len(versions), len(files)
+
+    def best_split(self, candidates, tried):
+        # Minimises the largest group of candidates that would share an
+        # answer (a hash, or absence of the file).
+        best, best_largest = None, len(candidates)
+        for name, hashes in self.files.items():
+            if name in tried:
+                continue
+            largest = max(Counter(hashes.get(version) for version in candidates).values())
+            if largest < best_largest:
+                best, best_largest = name, largest
+                if largest * 2 <= len(candidates) + 1:
+                    break
+        return best
+
+    def narrow(self, candidates, name, digest):
+        hashes = self.files[name]
+        return {version for version in candidates if hashes.get(version) == digest}
+
+class PluginDatabase:
+    # Plugin slug -> main file, parsed once per wordlist path and shared by
+    # every scanner in the process.
+    loaded = {}
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or os.path.join(DATA_DIR, 'plugins.txt')
+        database = cls.loaded.get(path)
+        if database is None:
+            entries = {}
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.split('#', 1)[0].strip()
+                    if line:
+                        slug, _, main_file = line.partition('/')
+                        entries.setdefault(slug, main_file or None)
+            database = cls.loaded[path] = cls(entries)
+        return database
+
+    def __contains__(self, slug):
+        return slug in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def main_file(self, slug):
+        return self.entries.get(slug)
+
+class ChunkMatcher:
+    # Runs byte regexes over a body while it streams in. Only a short tail of
+    # the previous chunk is kept so a match split across chunks is found
+    # without holding the whole body.
+
+    def __init__(self, patterns, overlap=4096):
+        self.patterns = patterns
+        self.overlap = overlap
+        self.matches = {}
+        self.tail = b''
+
+    def feed(self, chunk):
+        window = self.tail + chunk
+        for name, pattern in self.patterns.items():
+            if self.matches.get(name) is None:
+                self.matches[name] = pattern.search(window)
+        self.tail = window[-self.overlap:]
+        return all(match is not None for match in self.matches.values())
+
+class CapturedResponse:
+    # Status, headers and (possibly truncated) body of a finished request,
+    # safe to keep and share after the connection has been released.
+    __slots__ = ('url', 'status', 'headers', 'body', 'truncated', 'matches')
+
+    def __init__(self, url, status, headers, body=b'', truncated=False, matches=None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.truncated = truncated
+        self.matches = matches if matches is not None else {}
+
+    async def read(self):
+        return self.body
+
+    async def text(self, encoding='utf-8', errors='replace'):
+        return self.body.decode(encoding, errors)
+
+    def match(self, patterns):
+        for name, pattern in patterns.items():
+            if name not in self.matches:
+                self.matches[name] = pattern.search(self.body)
+        return self.matches
+
+SOFT_404_PREFIX = 4096
+WORD = re.compile(rb'[A-Za-z0-9_]{3,}')
+
+def simhash(data):
+    # 64-bit SimHash over the words of `data`, weighted by frequency:
+    # near-identical pages (a themed 404 echoing the requested path) differ
+    # in only a few bits.
+    weights = [0] * 64
+    for word, count in Counter(WORD.findall(data)).items():
+        h = hash(word)
+        for bit in range(64):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+class PageSignature:
+    # Cheap identity of a response: status, length on a quarter-octave scale
+    # (None when unknown) and the SimHash of the first few KB. The SimHash
+    # costs milliseconds on the event loop, so it is only computed once a
+    # comparison gets past status and length.
+    __slots__ = ('status', 'bucket', 'prefix', 'digest')
+
+    def __init__(self, response):
+        length = response.headers.get('Content-Length')
+        if length is None and not response.truncated:
+            length = len(response.body)
+        self.status = response.status
+        self.bucket = round(math.log2(int(length)) * 4) if length and str(length).isdigit() and int(length) > 0 else None
+        self.prefix = response.body[:SOFT_404_PREFIX]
+        self.digest = None
+
+    @property
+    def simhash(self):
+        if self.digest is None:
+            self.digest = simhash(self.prefix)
+            self.prefix = None
+        return self.digest
+
+    def matches(self, other, distance=8):
+        if self.status != other.status:
+            return False
+        if self.bucket is not None and other.bucket is not None and abs(self.bucket - other.bucket) > 1:
+            return False
+        return bin(self.simhash ^ other.simhash).count('1') <= distance
+
+FORM_TAG = re.compile(rb'<form[\s>]', re.I)
+
+def has_text_input_form(body):
+    # Runs in a worker process: a tag-filtered lxml event pass, no tree kept.
+    depth = 0
+    try:
+        for event, element in etree.iterparse(io.BytesIO(body), events=('start', 'end'), tag=('form', 'input'), html=True, recover=True):
+            if element.tag == 'form':
+                depth += 1 if event == 'start' else -1
+            elif depth > 0 and event == 'start' and (element.get('type') or '').lower() == 'text':
+                return True
+            if event == 'end':
+                element.clear()
+    except etree.LxmlError:
+        pass
+    return False
+
+class HtmlAnalyzer:
+    # Keeps HTML parsing off the event loop. A byte-level prefilter drops
+    # pages without a <form before anything is parsed; the rest go to a
+    # process pool so analysis scales across cores while the loop fetches.
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.pool = None
+
+    async def has_text_input_form(self, body):
+        if not FORM_TAG.search(body):
+            return False
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, has_text_input_form, body)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+class SitemapParser:
+    # Incremental parser for sitemaps and sitemap indexes, fed chunk by chunk
+    # as they download. Gzipped sitemaps are inflated on the fly and finished
+    # <url>/<sitemap> elements are dropped so memory stays flat.
+
+    def __init__(self, on_page, on_sitemap):
+        self.on_page = on_page
+        self.on_sitemap = on_sitemap
+        self.inflate = None
+        self.started = False
+        self.parser = etree.XMLPullParser(events=('end',), recover=True, resolve_entities=False, no_network=True)
+
+    def feed(self, chunk):
+        if not self.started:
+            self.started = True
+            if chunk[:2] == b'\x1f\x8b':
+                self.inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.inflate is not None:
+            chunk = self.inflate.decompress(chunk)
+        self.parser.feed(chunk)
+
+        stop = False
+        for event, element in self.parser.read_events():
+            tag = local_name(element.tag)
+            if tag == 'loc' and element.text:
+                # Only a <loc> directly under <url> or <sitemap> counts; the
+                # image, video and news extensions nest their own <loc>s.
+                parent = element.getparent()
+                parent = local_name(parent.tag) if parent is not None else None
+                if parent == 'sitemap':
+                    stop = self.on_sitemap(element.text.strip()) or stop
+                elif parent == 'url':
+                    stop = self.on_page(element.text.strip()) or stop
+            elif tag in ('url', 'sitemap'):
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        return stop
+
+class SitemapCrawler:
+    # Walks robots.txt Sitemap: lines and /wp-sitemap.xml through a
+    # deduplicated frontier drained by a worker pool. Nested sitemaps are
+    # followed up to max_depth and at most max_urls pages are visited.
+
+    def __init__(self, scanner, on_form, analyzer, max_urls=10000, max_depth=3, workers=10):
+        self.scanner = scanner
+        self.on_form = on_form
+        self.analyzer = analyzer
+        self.max_urls = max_urls
+        self.max_depth = max_depth
+        self.workers = workers
+        self.frontier = asyncio.Queue()
+        self.seen = set()
+        self.pages = 0
+
+    def enqueue(self, kind, url, depth):
+        if url in self.seen:
+            return False
+        if kind == 'sitemap' and depth > self.max_depth:
+            return False
+        if kind == 'page':
+            if self.pages >= self.max_urls:
+                return True
+            self.pages += 1
+        self.seen.add(url)
+        self.frontier.put_nowait((kind, url, depth))
+        return False
+
+    async def seeds(self):
+        robots = await self.scanner.artifact('robots')
+        return [f'{self.scanner.url}/wp-sitemap.xml'] + robots['sitemaps']
+
+    async def crawl_sitemap(self, url, depth):
+        parser = SitemapParser(lambda page: self.enqueue('page', page, depth),
+                               lambda sitemap: self.enqueue('sitemap', sitemap, depth + 1))
+        response = await self.scanner.request(url, retries=1, on_chunk=parser.feed)
+        if response is None or response.status != 200:
+            self.scanner.log(f'Sitemap not available: {url}', color=Fore.YELLOW)
+
+    async def crawl_page(self, url):
+        response = await self.scanner.fetch(url)
+        if response and await self.scanner.analyze('form', response.body, self.analyzer.has_text_input_form):
+            self.on_form(url)
+
+    async def worker(self):
+        while True:
+            kind, url, depth = await self.frontier.get()
+            try:
+                if kind == 'sitemap':
+                    await self.crawl_sitemap(url, depth)
+                else:
+                    await self.crawl_page(url)
+            except Exception as e:
+                self.scanner.log(f'Error crawling {url}: {e}', color=Fore.RED)
+            finally:
+                self.frontier.task_done()
+
+    async def run(self):
+        for url in await self.seeds():
+            self.enqueue('sitemap', url, 0)
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        try:
+            await self.frontier.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+LISTING_ENTRY = re.compile(rb'''
+    <a\s+href="(?P<href>[^"?#]+)"[^>]*>[^<]*</a>
+    (?:\s*</td>\s*<td[^>]*>)?\s*
+    (?P<mtime>\d{4}-\d\d-\d\d\s\d\d:\d\d(?::\d\d)?|\d\d-[A-Za-z]{3}-\d{4}\s\d\d:\d\d(?::\d\d)?)?
+    (?:\s*</td>\s*<td[^>]*>)?\s*
+    (?P<size>\d+(?:\.\d+)?[KMGT]?(?![\w.])|-)?
+''', re.X | re.I)
+LISTED_DIRECTORIES = ('wp-content/uploads/', 'wp-content/plugins/', 'wp-content/themes/', 'wp-includes/', 'wp-admin/')
+SENSITIVE_FILE = re.compile(r'\.(?:sql|sql\.gz|gz|tgz|tar|zip|7z|rar|bak|old|orig|swp|log|env|dump|db|sqlite3?|csv|xlsx?)$', re.I)
+SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+def listing_size(size):
+    # "12345", "12M" or "1.5K" as listed by nginx / Apache; None for "-".
+    if not size or size == b'-':
+        return None
+    size = size.decode().upper()
+    unit = size[-1] if size[-1] in SIZE_UNITS else ''
+    return int(float(size[:len(size) - len(unit)]) * SIZE_UNITS[unit])
+
+def listing_mtime(mtime):
+    if not mtime:
+        return None
+    mtime = ' '.join(mtime.decode().split())
+    for layout in ('%d-%b-%Y %H:%M', '%d-%b-%Y %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S'):
+        try:
+            return datetime.strptime(mtime, layout).isoformat()
+        except ValueError:
+            pass
+    return mtime
+
+class ListingParser:
+    # Incremental parser for Apache and nginx autoindex pages. Both put one
+    # entry per line (or table row), so complete rows are matched as chunks
+    # arrive and only the unfinished last one is carried over. feed()
+    # returns True once on_entry asks to stop.
+
+    def __init__(self, on_entry):
+        self.on_entry = on_entry
+        self.tail = b''
+
+    def feed(self, chunk):
+        data = self.tail + chunk
+        end = max(data.rfind(b'\n') + 1, data.rfind(b'<tr'))
+        self.tail = data[end:] if end > 0 else data
+        return end > 0 and self.parse(data[:end])
+
+    def close(self):
+        tail, self.tail = self.tail, b''
+        return self.parse(tail)
+
+    def parse(self, data):
+        for match in LISTING_ENTRY.finditer(data):
+            if self.on_entry(match.group('href').decode('utf-8', 'replace'), match.group('mtime'), match.group('size')):
+                return True
+        return False
+
+class ListingCrawler:
+    # Inventories an open directory listing and every listing below it
+    # through a deduplicated frontier drained by a worker pool, like the
+    # sitemap crawler. Entries are streamed to on_file as they are parsed and
+    # not kept; depth, entry count and request rate are capped.
+
+    def __init__(self, scanner, on_file, max_depth=5, max_entries=100000, workers=5, rate=10):
+        self.scanner = scanner
+        self.on_file = on_file
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.workers = workers
+        self.rate = rate
+        self.frontier = asyncio.Queue()
+        self.seen = set()
+        self.entries = 0
+        self.next_slot = 0.0
+
+    def enqueue(self, url, depth):
+        if url not in self.seen and depth <= self.max_depth:
+            self.seen.add(url)
+            self.frontier.put_nowait((url, depth))
+
+    async def throttle(self):
+        if self.rate:
+            now = asyncio.get_running_loop().time()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1 / self.rate
+            await asyncio.sleep(slot - now)
+
+    async def crawl(self, url, depth):
+        def on_entry(href, mtime, size):
+            target = urljoin(url, href)
+            # Parent links, absolute links and sort links are not entries.
+            if not target.startswith(url) or target == url:
+                return False
+            if self.entries >= self.max_entries:
+                return True
+            self.entries += 1
+            if target.endswith('/'):
+                self.enqueue(target, depth + 1)
+            else:
+                self.on_file(target, listing_size(size), listing_mtime(mtime))
+            return False
+
+        await self.throttle()
+        parser = ListingParser(on_entry)
+        response = await self.scanner.request(url, retries=2, on_chunk=parser.feed)
+        if response is not None and response.status == 200:
+            parser.close()
+
+    async def worker(self):
+        while True:
+            url, depth = await self.frontier.get()
+            try:
+                await self.crawl(url, depth)
+            except Exception as e:
+                self.scanner.log(f'Error listing {url}: {e}', color=Fore.RED)
+            finally:
+                self.frontier.task_done()
+
+    async def run(self, urls):
+        for url in urls:
+            self.enqueue(url, 0)
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        try:
+            await self.frontier.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+class ResponseCache:
+    # Per-scan response store. Concurrent requests for the same key share a
+    # single in-flight fetch, and finished responses whose body fits the size
+    # bound are kept in LRU order within an entry and a total byte budget.
+    # Failed fetches are never kept, so a later caller retries them.
+
+    def __init__(self, max_entries=256, max_body=1 << 20, max_bytes=4 << 20):
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.max_entries = max_entries
+        self.max_body = max_body
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, key):
+        entry = self.entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def values(self):
+        return [response for response, size in self.entries.values()]
+
+    async def get(self, key, load):
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+        future = self.inflight.get(key)
+        if future is not None:
+            self.hits += 1
+            response, size = await asyncio.shield(future)
+            return response
+
+        self.misses += 1
+        future = self.inflight[key] = asyncio.ensure_future(load())
+        try:
+            response, size = await asyncio.shield(future)
+        finally:
+            del self.inflight[key]
+
+        if response is not None and size <= self.max_body:
+            self.entries[key] = (response, size)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                old, old_size = self.entries.popitem(last=False)[1]
+                self.size -= old_size
+        return response
+
+# Name of the check a coroutine is running for; set once per check task and
+# inherited by everything it spawns, so findings are tagged without plumbing.
+CURRENT_CHECK = contextvars.ContextVar('check', default=None)
+
+class Finding:
+    # One result of a check. Severity is one of the Code_Color levels.
+    __slots__ = ('target', 'check', 'kind', 'severity', 'message', 'data')
+
+    def __init__(self, target, check, kind, severity, message, data):
+        self.target = target
+        self.check = check
+        self.kind = kind
+        self.severity = severity
+        self.message = message
+        self.data = data
+
+    def to_dict(self):
+        return {'target': self.target, 'check': self.check, 'kind': self.kind, 'severity': self.severity,
+                'message': self.message, 'data': self.data}
+
+class ConsoleSink:
+    # Coloured human-readable output, the scanner's historical format.
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def emit(self, finding):
+        self.stream.write(f'{getattr(Code_Color, finding.severity, Code_Color.info)} {finding.message}\n')
+
+    def log(self, message, color=Fore.GREEN):
+        self.stream.write(f'{color}{message}{Style.RESET_ALL}\n' if color else f'{message}\n')
+
+    def close(self):
+        self.stream.flush()
+
+class BufferedSink:
+    # Collects findings and hands them to a single writer thread in batches,
+    # so the event loop never blocks on disk and records are never interleaved.
+
+    def __init__(self, batch_size=256):
+        self.batch = []
+        self.batch_size = batch_size
+        self.writer = ThreadPoolExecutor(1)
+        self.pending = []
+
+    def emit(self, finding):
+        self.batch.append(self.encode(finding))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            batch, self.batch = self.batch, []
+            # Finished writes are dropped; result() re-raises a failed one here.
+            self.pending = [future for future in self.pending if not future.done() or future.result()]
+            self.pending.append(self.writer.submit(self.write, batch))
+
+    def close(self):
+        self.flush()
+        self.writer.shutdown(wait=True)
+        for future in self.pending:
+            future.result()
+        self.finish()
+
+class JsonLinesSink(BufferedSink):
+
+    def __init__(self, path, batch_size=256, append=True):
+        super().__init__(batch_size)
+        self.stream = sys.stdout if path == '-' else open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def encode(self, finding):
+        return json.dumps(finding.to_dict(), separators=(',', ':'), default=str)
+
+    def write(self, batch):
+        self.stream.write('\n'.join(batch) + '\n')
+        self.stream.flush()
+
+    def finish(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+class SQLiteSink(BufferedSink):
+
+    def __init__(self, path, batch_size=256, append=True):
+        super().__init__(batch_size)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS findings (id INTEGER PRIMARY KEY, time REAL, target TEXT, "check" TEXT, kind TEXT, severity TEXT, message TEXT, data TEXT)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS findings_target ON findings (target)')
+        if not append:
+            with self.db:
+                self.db.execute('DELETE FROM findings')
+
+    def encode(self, finding):
+        return (time.time(), finding.target, finding.check, finding.kind, finding.severity, finding.message,
+                json.dumps(finding.data, separators=(',', ':'), default=str))
+
+    def write(self, batch):
+        with self.db:
+            self.db.executemany('INSERT INTO findings (time, target, "check", kind, severity, message, data) VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+
+    def finish(self):
+        self.db.close()
+
+class Reporter:
+    # Fans findings out to every sink. The console, if any, also receives
+    # progress messages that are not findings.
+
+    def __init__(self, sinks=(), console=None):
+        self.sinks = list(sinks)
+        self.console = console
+        if console is not None:
+            self.sinks.append(console)
+
+    def emit(self, finding):
+        for sink in self.sinks:
+            sink.emit(finding)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+class JobStore(SQLiteSink):
+    # Checkpoint of a fleet scan: which (target, check) pairs finished, their
+    # findings and the last error of the ones that did not. A pair's findings
+    # are held back until it finishes and written in the same transaction as
+    # its job row, so a crash never leaves half a check behind. A pair that
+    # outgrows max_held findings is not held any further; it is recorded as
+    # failed so a resumed run repeats it. Writes are batched like any other
+    # sink; a batch also goes out every few seconds.
+
+    def __init__(self, path, batch_size=256, flush_interval=2.0, max_held=10000):
+        super().__init__(path, batch_size)
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS jobs (target TEXT, "check" TEXT, status TEXT, error TEXT, attempts INTEGER, updated REAL, '
+                        'PRIMARY KEY (target, "check")) WITHOUT ROWID')
+        self.db.commit()
+        self.held = {}
+        self.max_held = max_held
+        self.flush_interval = flush_interval
+        self.flushed = time.monotonic()
+
+    def emit(self, finding):
+        key = (finding.target, finding.check)
+        held = self.held.setdefault(key, [])
+        if held is None:
+            return
+        if len(held) >= self.max_held:
+            self.held[key] = None
+        else:
+            held.append(finding)
+
+    def done(self, target, check):
+        findings = self.held.pop((target, check), ())
+        if findings is None:
+            self.record(target, check, 'failed', f'more than {self.max_held} findings to checkpoint', ())
+        else:
+            self.record(target, check, 'done', None, [self.encode(finding) for finding in findings])
+
+    def failed(self, target, check, error):
+        self.held.pop((target, check), None)
+        self.record(target, check, 'failed', error, ())
+
+    def record(self, target, check, status, error, findings):
+        self.batch.append((target, check, status, error, findings))
+        if len(self.batch) >= self.batch_size or time.monotonic() - self.flushed > self.flush_interval:
+            self.flush()
+            self.flushed = time.monotonic()
+
+    def write(self, batch):
+        now = time.time()
+        with self.db:
+            self.db.executemany('INSERT INTO jobs VALUES (?, ?, ?, ?, 1, ?) ON CONFLICT (target, "check") DO UPDATE SET '
+                                'status = excluded.status, error = excluded.error, attempts = attempts + 1, updated = excluded.updated',
+                                [(target, check, status, error, now) for target, check, status, error, findings in batch])
+            done = [(target, check) for target, check, status, error, findings in batch if status == 'done']
+            self.db.executemany('DELETE FROM findings WHERE target = ? AND "check" = ?', done)
+            self.db.executemany('INSERT INTO findings (time, target, "check", kind, severity, message, data) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                [row for target, check, status, error, findings in batch for row in findings])
+
+    def load(self, target):
+        done = {check for check, in self.db.execute('SELECT "check" FROM jobs WHERE target = ? AND status = \'done\'', (target,))}
+        findings = [Finding(target, check, kind, severity, message, json.loads(data))
+                    for check, kind, severity, message, data in self.db.execute(
+                        'SELECT "check", kind, severity, message, data FROM findings WHERE target = ? ORDER BY id', (target,))
+                    if check in done]
+        return done, findings
+
+    async def completed(self, target):
+        # Runs on the writer thread, after every write queued so far.
+        self.flush()
+        return await asyncio.get_running_loop().run_in_executor(self.writer, self.load, target)
+
+class HttpCache:
+    # Bodies and validators kept on disk across runs. A rescan sends
+    # If-None-Match / If-Modified-Since and takes a 304 in place of the body.
+    # Only complete 200 GETs that carry an ETag or Last-Modified are stored;
+    # the least recently used entries go once the size bound is passed.
+    # Results of expensive analyses are memoised by body hash alongside.
+
+    def __init__(self, path, max_bytes=256 << 20, max_entry=4 << 20, max_results=100000):
+        self.max_bytes = max_bytes
+        self.max_entry = max_entry
+        self.max_results = max_results
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, headers TEXT, body BLOB, size INTEGER, used REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_used ON responses (used)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS results (digest TEXT, name TEXT, result TEXT, used REAL, PRIMARY KEY (digest, name)) WITHOUT ROWID')
+        # The total body size is kept by triggers inside the database, so the
+        # shards of a sharded fleet sharing one file all see the same total.
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER);
+            CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses
+                BEGIN UPDATE meta SET value = value + new.size WHERE name = 'size'; END;
+            CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses
+                BEGIN UPDATE meta SET value = value + new.size - old.size WHERE name = 'size'; END;
+            CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses
+                BEGIN UPDATE meta SET value = value - old.size WHERE name = 'size'; END;
+            INSERT OR IGNORE INTO meta VALUES ('size', (SELECT COALESCE(SUM(size), 0) FROM responses));
+        ''')
+        # All database work runs on one thread, off the event loop and in order.
+        self.worker = ThreadPoolExecutor(1)
+        self.revalidated = 0
+
+    async def call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.worker, func, *args)
+
+    def load(self, url):
+        row = self.db.execute('SELECT etag, last_modified, headers, body FROM responses WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, headers, body = row
+        return {'etag': etag, 'last_modified': last_modified, 'headers': CIMultiDictProxy(CIMultiDict(json.loads(headers))), 'body': body}
+
+    async def get(self, url):
+        return await self.call(self.load, url)
+
+    @staticmethod
+    def validators(entry):
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def save(self, url, headers, body):
+        now = time.time()
+        with self.db:
+            # Writing first takes the write lock before anything is read, so
+            # the total read below is current even with other writers.
+            self.db.execute('INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (url) DO UPDATE SET etag = excluded.etag, '
+                            'last_modified = excluded.last_modified, headers = excluded.headers, body = excluded.body, size = excluded.size, used = excluded.used',
+                            (url, headers.get('ETag'), headers.get('Last-Modified'), json.dumps(list(headers.items())), body, len(body), now))
+            total = self.db.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()[0]
+            if total > self.max_bytes:
+                # Evict down to 90% so the next few stores do not evict again.
+                excess, stale = total - self.max_bytes * 0.9, []
+                for old, size in self.db.execute('SELECT url, size FROM responses ORDER BY used LIMIT 10000'):
+                    if excess <= 0:
+                        break
+                    stale.append((old,))
+                    excess -= size
+                self.db.executemany('DELETE FROM responses WHERE url = ?', stale)
+
+    def store(self, url, headers, body):
+        if len(body) <= self.max_entry and (headers.get('ETag') or headers.get('Last-Modified')):
+            self.worker.submit(self.save, url, headers.copy(), bytes(body))
+
+    def touch(self, url):
+        self.revalidated += 1
+        self.worker.submit(self.execute, 'UPDATE responses SET used = ? WHERE url = ?', (time.time(), url))
+
+    def execute(self, sql, params):
+        with self.db:
+            self.db.execute(sql, params)
+
+    def lookup_result(self, digest, name):
+        row = self.db.execute('SELECT result FROM results WHERE digest = ? AND name = ?', (digest, name)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def result(self, digest, name):
+        return await self.call(self.lookup_result, digest, name)
+
+    def save_result(self, digest, name, result):
+        self.worker.submit(self.execute, 'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', (digest, name, json.dumps(result), time.time()))
+
+    def close(self):
+        self.worker.submit(self.execute, 'DELETE FROM results WHERE used < (SELECT used FROM results ORDER BY used DESC LIMIT 1 OFFSET ?)', (self.max_results,))
+        self.worker.shutdown(wait=True)
+        self.db.close()
+
+class Check:
+    # A check as the scheduler sees it: the scanner method that runs it, the
+    # artifacts that must be truthy before it starts (gates), and its tier.
+    # Lower tiers finish before higher ones start.
+    __slots__ = ('name', 'method', 'needs', 'tier')
+
+    def __init__(self, name, method, needs=('wordpress',), tier=0):
+        self.name = name
+        self.method = method
+        self.needs = needs
+        self.tier = tier
+
+CHECKS = {check.name: check for check in (
+    Check('wordpress', 'check_wordpress_gate', needs=()),
+    Check('readme', 'check_readme'),
+    Check('debug-log', 'check_debug_log'),
+    Check('directory-listing', 'check_directory_listing'),
+    Check('xml-rpc', 'is_xml_rpc'),
+    Check('robots-text', 'check_robots_text', needs=()),
+    Check('full-path-disclosure', 'check_full_path_disclosure'),
+    Check('check-themes', 'check_themes'),
+    Check('backup-file', 'check_backup_file', tier=1),
+    Check('enum-users', 'enum_wordpress_users', tier=1),
+    Check('sitemap-forms', 'crawl_sitemap_for_forms', tier=1),
+    Check('check-plugins', 'check_plugins', tier=1),
+    Check('core-version', 'check_core_version', tier=1),
+    Check('listing-inventory', 'check_listing_inventory', tier=1),
+)}
+
+# Shared results and the scanner methods that provide them.
+ARTIFACTS = {
+    'wordpress': 'check_wordpress',
+    'fingerprint': 'build_fingerprint',
+    'soft-404': 'calibrate',
+    'robots': 'parse_robots',
+    'listings': 'find_listings',
+}
+
 class AsyncWordPressScanner:
 
-    def __init__(self, url, user_agent):
+    def __init__(self, url, user_agent, transport=None, **options):
         self.url = str(url)
         self.user_agent = user_agent
+        self.transport = transport
+        self.options = options
+        self.reporter = options.get('reporter') or Reporter(console=ConsoleSink())
+        self.responses = ResponseCache()
         self.files = set()
         self.version = None
         self.users = []
-    
-    async def fetch(self, session, url, retries=5):
+        self.plugins = {}
+        self.themes = {}
+        self.artifacts = {}
+        self.jobs = options.get('jobs')
+        self.http_cache = options.get('http_cache')
+        self.errors = {}
+        self.replayed = set()
+
+    def report(self, kind, message, severity='ok', **data):
+        check = CURRENT_CHECK.get()
+        if check in self.replayed:
+            # Already replayed from the job store; a gate that has to run
+            # again for the pending checks must not report twice.
+            return
+        finding = Finding(self.url, check, kind, severity, message, data)
+        self.reporter.emit(finding)
+        if self.jobs is not None:
+            self.jobs.emit(finding)
+
+    async def analyze(self, name, body, compute):
+        # Result of an expensive analysis of a body. With an HTTP cache it is
+        # memoised by content hash, so an unchanged page is not analysed again.
+        if self.http_cache is None:
+            return await compute(body)
+        digest = hashlib.sha1(body).hexdigest()
+        result = await self.http_cache.result(digest, name)
+        if result is None:
+            result = await compute(body)
+            self.http_cache.save_result(digest, name, result)
+        return result
+
+    def give_up(self, message, *args):
+        # A request that could not be completed. Remembered per check so a
+        # resumable run retries the check instead of recording it as done.
+        self.errors[CURRENT_CHECK.get()] = message.format(*args)
+        self.log(message, *args, color=Fore.RED)
+
+    def log(self, message, *args, color=Fore.GREEN):
+        # Console-only progress output. Arguments are formatted lazily so a
+        # quiet run pays nothing for messages on hot paths.
+        if self.reporter.console is not None:
+            self.reporter.console.log(message.format(*args) if args else message, color)
+
+    async def fetch(self, url, retries=5, method='GET', headers=None, accept=(200,), patterns=None, until_match=False, limit=None, cache=True,
+                    allow_redirects=True):
+        key = (method, url, tuple(sorted(headers.items())) if headers else None)
+        if not allow_redirects:
+            key += (False,)
+        if limit is not None or (until_match and patterns):
+            # A body that may be cut short only answers requests that cut it the same way.
+            key += (limit, tuple(sorted(patterns.items())) if until_match and patterns else None)
+        # Error statuses the caller accepts come back unretried, so only
+        # callers accepting the same ones share the response.
+        answered = tuple(sorted(status for status in accept or () if status == 429 or status >= 500))
+        if answered:
+            key += (answered,)
+
+        async def load():
+            response = await self.request(url, retries, method, headers, patterns, until_match, limit, allow_redirects=allow_redirects,
+                                          answered=answered)
+            return response, len(response.body) if response is not None else 0
+
+        # A HEAD is answered from an already cached GET of the same URL.
+        response = self.responses.peek(('GET', url, None)) if method == 'HEAD' and not headers and allow_redirects else None
+        if response is None and not cache:
+            response, size = await load()
+        elif response is None:
+            response = await self.responses.get(key, load)
+            if response is None:
+                # The shared fetch may have given up under another check.
+                self.errors.setdefault(CURRENT_CHECK.get(), f'All attempts to fetch {url} failed.')
+        if response is None or (accept is not None and response.status not in accept):
+            return None
+        if patterns:
+            response.match(patterns)
+        return response
+
+    async def request(self, url, retries=5, method='GET', headers=None, patterns=None, until_match=False, limit=None, on_chunk=None,
+                      allow_redirects=True, answered=()):
+        request_headers = {'User-Agent': self.user_agent}
+        if headers:
+            request_headers.update(headers)
+        if limit is None:
+            limit = self.transport.max_body
+
+        # Complete GETs are revalidated against the on-disk cache: a 304 is
+        # answered with the stored body, a fresh 200 replaces it.
+        cached = None
+        if self.http_cache is not None and method == 'GET' and not headers:
+            cached = await self.http_cache.get(url)
+            if cached is not None:
+                request_headers.update(self.http_cache.validators(cached))
+            if on_chunk is not None:
+                # Streamed bodies are only kept while they still fit in a
+                # cache entry; past that the response is left uncached.
+                kept, kept_size, feed = [], 0, on_chunk
+
+                def on_chunk(chunk):
+                    nonlocal kept, kept_size
+                    if kept is not None:
+                        kept_size += len(chunk)
+                        if kept_size > self.http_cache.max_entry:
+                            kept = None
+                        else:
+                            kept.append(chunk)
+                    return feed(chunk)
+
         for attempt in range(retries):
             try:
-                async with session.get(url, headers={'User-Agent': self.user_agent}, timeout=20) as response:
-                    print(f'{Fore.CYAN}Fetching {url} - Status: {response.status}{Style.RESET_ALL}')
+                async with self.transport.request(method, url, request_headers, allow_redirects, attempt=attempt) as response:
+                    self.log('Fetching {} - Status: {}', url, response.status, color=Fore.CYAN)
 
-                    if response.status == 200:
-                        return response
+                    if (response.status == 429 or response.status >= 500) and response.status not in answered:
+                        delay = self.transport.backoff(attempt, response.headers.get('Retry-After'))
+                        if delay is None:
+                            self.give_up('Server at {} asked to retry later than allowed: Status {}', url, response.status)
+                            return None
+                        reason = 'Rate limited' if response.status == 429 else 'Server error'
+                        self.log('{} at {}: Status {}. Retrying in {:.1f}s...', reason, url, response.status, delay, color=Fore.RED)
+                        await asyncio.sleep(delay)
+                        continue
+                    elif response.status == 304 and cached is not None:
+                        self.http_cache.touch(url)
+                        if on_chunk is not None:
+                            feed(cached['body'])
+                        captured = CapturedResponse(str(response.url), 200, cached['headers'], b'' if on_chunk else cached['body'])
+                        if patterns:
+                            captured.match(patterns)
+                        return captured
                     elif response.status == 404:
-                        print(f'{Fore.YELLOW}Page not found: {url}{Style.RESET_ALL}')
-                        return None
+                        self.log('Page not found: {}', url, color=Fore.YELLOW)
                     elif response.status == 401:
-                        print(f'{Fore.RED}Unauthorized access to {url}: Status {response.status}{Style.RESET_ALL}')
-                        return None
-                    elif response.status >= 500:
-                        print(f'{Fore.RED}Server error at {url}: Status {response.status}. Retrying...{Style.RESET_ALL}')
-                        await asyncio.sleep(2)
-                        continue
-                    else:
-                        print(f'{Fore.YELLOW}Failed to fetch {url}: Status {response.status}{Style.RESET_ALL}')
-                        return None
+                        self.log('Unauthorized access to {}: Status {}', url, response.status, color=Fore.RED)
+                    elif response.status not in (200, 206) and allow_redirects:
+                        self.log('Failed to fetch {}: Status {}', url, response.status, color=Fore.YELLOW)
+
+                    if method == 'HEAD':
+                        return CapturedResponse(str(response.url), response.status, response.headers)
+                    captured = await self.read_body(response, limit, patterns, until_match, on_chunk if response.status == 200 else None)
+                    if self.http_cache is not None and response.status == 200 and not captured.truncated and method == 'GET' and not headers:
+                        if on_chunk is None:
+                            self.http_cache.store(url, response.headers, captured.body)
+                        elif kept is not None:
+                            self.http_cache.store(url, response.headers, b''.join(kept))
+                    return captured
 
+            except HostUnavailable as e:
+                self.give_up('Skipping {}: {}', url, e)
+                return None
             except asyncio.TimeoutError:
-                print(f'{Fore.RED}Timeout error fetching {url} on attempt {attempt + 1}{Style.RESET_ALL}')
-                await asyncio.sleep(2)
+                self.log('Timeout error fetching {} on attempt {}', url, attempt + 1, color=Fore.RED)
+                await asyncio.sleep(self.transport.backoff(attempt))
             except Exception as e:
-                print(f'{Fore.RED}Error fetching {url} on attempt {attempt + 1}: {e}{Style.RESET_ALL}')
-                await asyncio.sleep(2)
+                self.log('Error fetching {} on attempt {}: {}', url, attempt + 1, e, color=Fore.RED)
+                await asyncio.sleep(self.transport.backoff(attempt))
 
-        print(f'{Fore.RED}All attempts to fetch {url} failed.{Style.RESET_ALL}')
+        self.give_up('All attempts to fetch {} failed.', url)
         return None
 
-    async def check_wordpress(self, session):
+    async def read_body(self, response, limit, patterns=None, until_match=False, on_chunk=None):
+        # Streams at most `limit` bytes. Anything past that is left unread and
+        # the connection dropped, so a multi-gigabyte file costs one chunk.
+        # With on_chunk every chunk is handed over instead of being kept,
+        # until the callback returns True.
+        matcher = ChunkMatcher(patterns) if patterns else None
+        body = bytearray()
+        truncated = False
+
+        async for chunk in response.content.iter_chunked(65536):
+            if on_chunk is not None:
+                if on_chunk(chunk):
+                    truncated = not response.content.at_eof()
+                    break
+                continue
+            room = limit - len(body)
+            if len(chunk) >= room:
+                truncated = len(chunk) > room or not response.content.at_eof()
+                chunk = chunk[:room]
+            body += chunk
+            if matcher is not None and matcher.feed(chunk) and until_match:
+                truncated = truncated or not response.content.at_eof()
+                break
+            if len(body) >= limit:
+                break
+
+        return CapturedResponse(str(response.url), response.status, response.headers, bytes(body), truncated,
+                                matcher.matches if matcher else None)
+
+    async def probe(self, url, pattern=None, retries=2):
+        # Existence is decided with HEAD, then a one-byte Range GET when the
+        # server rejects HEAD, and a full GET only as the last resort. With a
+        # pattern the body is streamed only until the pattern shows up.
+        # On a host that answers any path with a 200 page, only the first few
+        # KB are read and compared with that page instead.
+        if await self.soft_404():
+            response = await self.fetch(url, retries, patterns={'probe': pattern} if pattern else None, limit=SOFT_404_PREFIX, cache=False)
+            if response is None or await self.is_soft_404(response):
+                return None
+            if pattern is None or response.matches['probe'] is not None:
+                return response
+            if not response.truncated:
+                return None
+
+        if pattern is None:
+            response = await self.fetch(url, retries, 'HEAD', accept=(200, 403, 405, 501))
+            if response is None or response.status == 200:
+                return response
+            response = await self.fetch(url, retries, headers={'Range': 'bytes=0-0'}, accept=(200, 206, 405, 416, 501), limit=1)
+            if response is None or response.status in (200, 206):
+                return response
+            return await self.fetch(url, retries)
+
+        response = await self.fetch(url, retries, patterns={'probe': pattern}, until_match=True)
+        if response is None or response.matches['probe'] is None:
+            return None
+        return response
+
+    async def probe_paths(self, paths, pattern=None, concurrency=20):
+        results = await bounded_map(lambda path: self.probe(f'{self.url}/{path}', pattern), paths, concurrency)
+        return [(path, response) for path, response in results if response is not None]
+
+    async def artifact(self, name):
+        # Result of a provider that several checks consume. Each provider runs
+        # once per scan, under its own name, and every caller shares the result.
+        # A provider that gave up fails its callers too, so a resumed run
+        # retries them instead of trusting a result built from missing data.
+        if name not in self.artifacts:
+            self.artifacts[name] = asyncio.ensure_future(self.provide(name))
+        result = await asyncio.shield(self.artifacts[name])
+        check = CURRENT_CHECK.get()
+        if name in self.errors and check != name:
+            self.errors.setdefault(check, f'{name} failed: {self.errors[name]}')
+        return result
+
+    async def provide(self, name):
+        CURRENT_CHECK.set(name)
+        return await getattr(self, ARTIFACTS[name])()
+
+    async def soft_404(self):
+        # Signatures of the pages this host serves for paths that cannot exist.
+        return await self.artifact('soft-404')
+
+    async def is_soft_404(self, response):
+        # The one place a response is classified against the host's soft-404
+        # pages; every existence check goes through here or through probe().
+        # Needs at least the first SOFT_404_PREFIX bytes of the body.
+        soft_404 = await self.soft_404()
+        if not soft_404 or response is None:
+            return False
+        signature = PageSignature(response)
+        return any(signature.matches(page) for page in soft_404)
+
+    async def calibrate(self):
+        token = lambda: ''.join(random.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=16))
+        paths = [token(), token() + '.php', token() + '.bak']
+        responses = await asyncio.gather(*(self.fetch(f'{self.url}/{path}', 2, limit=SOFT_404_PREFIX, cache=False) for path in paths))
+        signatures = [PageSignature(response) for response in responses if response is not None]
+        if signatures:
+            self.log(f'{self.url} answers unknown paths with a 200 page; probes are compared against {len(signatures)} soft-404 signatures.', color=Fore.YELLOW)
+        return signatures
+
+    async def passive_fingerprint(self):
+        # Built once per scan from the homepage and the RSS feed.
+        return await self.artifact('fingerprint')
+
+    async def build_fingerprint(self):
+        fingerprint = Fingerprint()
+        for response in await asyncio.gather(self.fetch(self.url), self.fetch(f'{self.url}/feed/')):
+            if response:
+                fingerprint.feed(response.body)
+
+        if fingerprint.version:
+            self.version = fingerprint.version
+            self.report('version', f'WordPress version {self.version} found passively.', version=self.version, source='fingerprint')
+            self.report_vulnerabilities('core', 'wordpress', self.version)
+        return fingerprint
+
+    async def check_wordpress(self):
+        self.log('\nChecking if site is a WordPress site...')
+        fingerprint = await self.passive_fingerprint()
+        if fingerprint.is_wordpress:
+            self.report('wordpress', 'WordPress detected via homepage fingerprint.', via='fingerprint')
+            return True
+
         wordpress_files = [
             'wp-login.php',
             'wp-admin/',
@@ -69,60 +1819,82 @@ class AsyncWordPressScanner:
             'xmlrpc.php'
         ]
 
-        print(f"{Fore.GREEN}\nChecking if site is a WordPress site...{Style.RESET_ALL}")
-        
         for path in wordpress_files:
             url = f"{self.url}/{path}"
-            response = await self.fetch(session, url)
+            response = await self.probe(url)
             if response:
-                print(f'{Fore.GREEN}WordPress detected via: {url}{Style.RESET_ALL}')
+                self.log(f'WordPress detected via: {url}')
                 break
         else:
             for reliable_path in wordpress_reliable_files:
                 url = f"{self.url}/{reliable_path}"
-                response = await self.fetch(session, url)
+                response = await self.probe(url)
                 if response:
-                    print(f'{Fore.GREEN}WordPress detected via reliable method: {url}{Style.RESET_ALL}')
+                    self.log(f'WordPress detected via reliable method: {url}')
                     break
             else:
-                print(f'{Fore.RED}Not a WordPress site.{Style.RESET_ALL}')
+                self.log('Not a WordPress site.', color=Fore.RED)
                 return False
 
-        response = await self.fetch(session, self.url)
-        if response:
-            try:
-                main_content = await response.text()
-                if '<meta name="generator" content="WordPress' in main_content:
-                    print(f'{Fore.GREEN}WordPress detected via meta tag.{Style.RESET_ALL}')
-                    return True
-            except Exception as e:
-                print(f'{Fore.RED}Error reading main page content: {e}{Style.RESET_ALL}')
-        
-        print(f'{Fore.GREEN}WordPress detected via files and directories.{Style.RESET_ALL}')
+        self.report('wordpress', f'WordPress detected via files and directories: {url}', via=url)
         return True
+
+    async def check_wordpress_gate(self):
+        return await self.artifact('wordpress')
         
-    async def check_readme(self, session):
-        response = await self.fetch(session, f'{self.url}/readme.html')
-        if response:
-            print(f'{Fore.GREEN}README file found at {self.url}/readme.html{Style.RESET_ALL}')
+    async def check_core_version(self):
+        self.log(f'\nPinning the WordPress version from static file hashes on {self.url}...')
+        index = self.options.get('fingerprints')
+        if index is None:
+            self.log('No static file hash index loaded (--fingerprint-db).', color=Fore.RED)
+            return None
+
+        candidates = set(range(len(index.versions)))
+        tried = set()
+        requests = 0
+        while len(candidates) > 1 and requests < self.options.get('fingerprint_max_requests', 15):
+            name = index.best_split(candidates, tried)
+            if name is None:
+                break
+            tried.add(name)
+            requests += 1
+            response = await self.fetch(f'{self.url}/{name}', retries=2, accept=(200, 404))
+            if response is None or response.truncated:
+                continue
+            digest = hashlib.md5(response.body).hexdigest() if response.status == 200 else None
+            remaining = index.narrow(candidates, name, digest)
+            # No candidate matching means the file was modified or the 404 is fake.
+            if remaining:
+                candidates = remaining
+
+        versions = sorted((index.versions[version] for version in candidates), key=version_key)
+        if len(versions) == 1:
+            self.version = versions[0]
+            self.report('version', f'WordPress version pinned to {self.version} after {requests} requests.', version=self.version, source='static-hashes')
+            self.report_vulnerabilities('core', 'wordpress', self.version)
         else:
-            print(f'{Fore.RED}No README file found.{Style.RESET_ALL}')
+            self.report('version', f'WordPress version narrowed to {len(versions)} candidates after {requests} requests: {", ".join(versions[:10])}',
+                        'info', candidates=versions, source='static-hashes')
+        return versions
 
-    async def check_debug_log(self, session):
-        print(f"{Fore.GREEN}Checking for debug.log...{Style.RESET_ALL}")
+    async def check_readme(self):
+        if await self.probe_paths(['readme.html']):
+            self.report('readme', f'README file found at {self.url}/readme.html', url=f'{self.url}/readme.html')
+        else:
+            self.log('No README file found.', color=Fore.RED)
+
+    async def check_debug_log(self):
+        self.log('Checking for debug.log...')
         try:
-            response = await self.fetch(session, f'{self.url}/debug.log')
-            if response is not None:
-                if '404' in response:
-                    print(f'{Fore.RED}No debug log file found at {self.url}/debug.log (404 error){Style.RESET_ALL}')
-                else:
-                    print(f'{Fore.GREEN}Debug log file found at {self.url}/debug.log{Style.RESET_ALL}')
-            else:
-                print(f'{Fore.YELLOW}Failed to fetch {self.url}/debug.log: No response received.{Style.RESET_ALL}')
+            found = await self.probe_paths(['debug.log', 'wp-content/debug.log'])
+            for path, response in found:
+                self.report('debug-log', f'Debug log file found at {self.url}/{path}', 'critical', url=f'{self.url}/{path}')
+            if not found:
+                self.log(f'No debug log file found at {self.url}/debug.log', color=Fore.RED)
         except Exception as e:
-            print(f'{Fore.RED}Error checking debug log: {e}{Style.RESET_ALL}')
+            self.log(f'Error checking debug log: {e}', color=Fore.RED)
 
-    async def check_backup_file(self, session):
+    async def check_backup_file(self):
         backup_files = [
             'wp-config.php~', 'wp-config.php.save', '.wp-config.php.bck', 
             'wp-config.php.bck', '.wp-config.php.swp', 'wp-config.php.swp', 
@@ -155,285 +1927,330 @@ class AsyncWordPressScanner:
             '.env', 'README.md', '.gitignore', 
         ]
 
-        print(f"{Fore.GREEN}\nChecking for backup files...{Style.RESET_ALL}")
-        backup_found = False
+        self.log('\nChecking for backup files...')
+        found = await self.probe_paths(backup_files)
+
+        for backup_file, response in found:
+            self.report('backup-file', f'Backup file found at: {self.url}/{backup_file}', 'critical', url=f'{self.url}/{backup_file}')
 
-        for backup_file in backup_files:
-            response = await self.fetch(session, f"{self.url}/{backup_file}")
-            if response and response.status == 200:
-                print(f'{Fore.GREEN}Backup file found at: {self.url}/{backup_file}{Style.RESET_ALL}')
-                backup_found = True
+        if not found:
+            self.log(f'No backup files found for {self.url}.', color=Fore.RED)
 
-        if not backup_found:
-            print(f'{Fore.RED}No backup files found for {self.url}.{Style.RESET_ALL}')
+    async def find_listings(self):
+        found = {path for path, response in await self.probe_paths(LISTED_DIRECTORIES, INDEX_OF)}
+        return [directory for directory in LISTED_DIRECTORIES if directory in found]
 
-    async def check_directory_listing(self, session):
-        directories = ['wp-content/uploads/', 'wp-content/plugins/', 'wp-content/themes/', 'wp-includes/', 'wp-admin/']
+    async def check_directory_listing(self):
         dir_names = ['Uploads', 'Plugins', 'Themes', 'Includes', 'Admin']
 
-        print(f"{Fore.GREEN}\nChecking for directory listings...{Style.RESET_ALL}")
+        self.log('\nChecking for directory listings...')
         
-        for directory, name in zip(directories, dir_names):
-            response = await self.fetch(session, self.url + '/' + directory)
-            if response and 'Index of' in response:
+        found = await self.artifact('listings')
+
+        for directory, name in zip(LISTED_DIRECTORIES, dir_names):
+            if directory in found:
                 self.files.add(directory)
-                print(f'{Fore.GREEN}{name} directory has directory listing enabled at: {self.url + "/" + directory}{Style.RESET_ALL}')
+                self.report('directory-listing', f'{name} directory has directory listing enabled at: {self.url + "/" + directory}', url=f'{self.url}/{directory}')
             else:
-                print(f'{Fore.YELLOW}{name} directory does not have directory listing enabled at: {self.url + "/" + directory}{Style.RESET_ALL}')
+                self.log(f'{name} directory does not have directory listing enabled at: {self.url + "/" + directory}', color=Fore.YELLOW)
 
+    async def check_listing_inventory(self):
+        # wp-includes/ and wp-admin/ list the same core files on every
+        # install; only the site's own directories are worth walking.
+        found = [directory for directory in await self.artifact('listings') if directory.startswith('wp-content/')]
+        if not found:
+            self.log(f'No open wp-content listing to inventory on {self.url}.', color=Fore.YELLOW)
+            return
+        await self.inventory_listings([f'{self.url}/{directory}' for directory in found])
 
-    async def is_xml_rpc(self, session):
-        print(f"{Fore.GREEN}\nChecking XML-RPC on {self.url}...{Style.RESET_ALL}")
+    async def inventory_listings(self, urls):
+        def on_file(url, size, mtime):
+            path = url[len(self.url) + 1:]
+            sensitive = SENSITIVE_FILE.search(path) is not None
+            if sensitive:
+                self.files.add(path)
+            self.report('listing-entry', f'{"Sensitive file" if sensitive else "File"} listed: {url} ({size if size is not None else "?"} bytes, {mtime or "unknown time"})',
+                        'critical' if sensitive else 'info', url=url, path=path, size=size, mtime=mtime)
+
+        crawler = ListingCrawler(self, on_file,
+                                 self.options.get('listing_max_depth', 5),
+                                 self.options.get('listing_max_entries', 100000),
+                                 self.options.get('listing_workers', 5),
+                                 self.options.get('listing_rate', 10))
+        await crawler.run(urls)
+        self.log(f'Inventoried {crawler.entries} entries in {len(crawler.seen)} listed directories.')
+        if crawler.entries >= crawler.max_entries:
+            self.log(f'Stopped at the {crawler.max_entries} entry limit.', color=Fore.YELLOW)
+
+
+    async def is_xml_rpc(self):
+        self.log(f'\nChecking XML-RPC on {self.url}...')
         url = f'{self.url}/xmlrpc.php'
-        response = await self.fetch(session, url)
-        
-        if response is not None:
-            print(f'{Fore.GREEN}XML-RPC Interface available under: {url}{Style.RESET_ALL}')
-        else:
-            print(f'{Fore.RED}Failed to fetch XML-RPC interface at: {url}{Style.RESET_ALL}')
+        fingerprint = await self.passive_fingerprint()
+        if fingerprint.pingback:
+            url = urljoin(self.url + '/', fingerprint.pingback)
+            self.log(f'XML-RPC advertised by pingback link: {url}')
+        response = await self.fetch(url, accept=None)
+        if response is not None and response.status == 200 and await self.is_soft_404(response):
+            response = CapturedResponse(response.url, 404, response.headers)
 
-        try:
-            async with session.get(url, headers={'User-Agent': self.user_agent}) as resp:
-                if resp.status == 200:
-                    print(f'{Fore.GREEN}XML-RPC Interface accessible at: {url}{Style.RESET_ALL}')
-                elif resp.status == 404:
-                    print(f'{Fore.RED}XML-RPC interface is not available (404 error).{Style.RESET_ALL}')
-                else:
-                    print(f'{Fore.YELLOW}XML-RPC interface inaccessible (Status: {resp.status}).{Style.RESET_ALL}')
-        except Exception as e:
-            print(f'{Fore.RED}Error checking XML-RPC status: {e}{Style.RESET_ALL}')
+        if response is None:
+            self.log(f'Failed to fetch XML-RPC interface at: {url}', color=Fore.RED)
+        elif response.status in (200, 405):
+            # A GET on a live endpoint answers 405 "XML-RPC server accepts POST requests only."
+            self.report('xml-rpc', f'XML-RPC Interface accessible at: {url}', url=url, status=response.status)
+        elif response.status == 404:
+            self.log('XML-RPC interface is not available (404 error).', color=Fore.RED)
+        else:
+            self.log(f'XML-RPC interface inaccessible (Status: {response.status}).', color=Fore.YELLOW)
 
-    async def check_robots_text(self, session):
-        print(f"{Fore.GREEN}\nChecking robots.txt on {self.url}...{Style.RESET_ALL}")
-        response = await self.fetch(session, f'{self.url}/robots.txt')
-        
+    async def parse_robots(self):
+        response = await self.fetch(f'{self.url}/robots.txt')
+        robots = {'found': response is not None, 'sitemaps': [], 'disallow': []}
         if response:
-            print(f'{Fore.GREEN}robots.txt available under: {self.url}/robots.txt{Style.RESET_ALL}')
-            lines = response.split('\n')
-            for l in lines:
-                if 'Disallow:' in l:
-                    print(f'{Fore.YELLOW}Interesting entry from robots.txt: {l}{Style.RESET_ALL}')
+            for line in (await response.text()).splitlines():
+                line = line.strip()
+                if line.lower().startswith('sitemap:'):
+                    robots['sitemaps'].append(line.split(':', 1)[1].strip())
+                elif 'Disallow:' in line:
+                    robots['disallow'].append(line)
+        return robots
+
+    async def check_robots_text(self):
+        self.log(f'\nChecking robots.txt on {self.url}...')
+        robots = await self.artifact('robots')
+
+        if robots['found']:
+            self.log(f'robots.txt available under: {self.url}/robots.txt')
+            for l in robots['disallow']:
+                self.report('robots-entry', f'Interesting entry from robots.txt: {l}', 'info', entry=l)
         else:
-            print(f'{Fore.RED}Failed to fetch robots.txt.{Style.RESET_ALL}')
+            self.log('Failed to fetch robots.txt.', color=Fore.RED)
 
-    async def check_full_path_disclosure(self, session):
-        print(f"{Fore.GREEN}\nChecking for Full Path Disclosure on {self.url}...{Style.RESET_ALL}")
-        response = await self.fetch(session, self.url + '/wp-includes/rss-functions.php')
+    async def check_full_path_disclosure(self):
+        self.log(f'\nChecking for Full Path Disclosure on {self.url}...')
+        response = await self.fetch(self.url + '/wp-includes/rss-functions.php', accept=(200, 500), patterns={'fpd': FATAL_ERROR}, until_match=True)
         
         if response:
-            regex = re.compile('Fatal error:.*? in (.*?) on', re.S)
-            matches = regex.findall(response)
+            match = response.matches['fpd']
 
-            if matches:
-                exposed_path = matches[0].replace('\n', '').strip()
-                print(f'{Fore.RED}Full Path Disclosure (FPD) detected in: {self.url + "/wp-includes/rss-functions.php"}{Style.RESET_ALL}')
-                print(f'{Fore.RED}Exposed Path: {exposed_path}{Style.RESET_ALL}')
+            if match:
+                exposed_path = match.group(1).decode('utf-8', 'replace').replace('\n', '').strip()
+                self.report('full-path-disclosure', f'Full Path Disclosure (FPD) detected in: {self.url + "/wp-includes/rss-functions.php"} - Exposed Path: {exposed_path}',
+                            'critical', url=f'{self.url}/wp-includes/rss-functions.php', path=exposed_path)
             else:
-                print(f'{Fore.YELLOW}No Full Path Disclosure detected.{Style.RESET_ALL}')
+                self.log('No Full Path Disclosure detected.', color=Fore.YELLOW)
         else:
-            print(f'{Fore.RED}Failed to fetch rss-functions.php for FPD check.{Style.RESET_ALL}')
+            self.log('Failed to fetch rss-functions.php for FPD check.', color=Fore.RED)
 
-    async def enum_wordpress_users(self, session):
+    async def enum_wordpress_users(self):
         if self.url.endswith('/'):
             self.url = self.url[:-1]
         wp_path = '/wp-json/wp/v2/users'
         final_url = self.url + wp_path
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_4) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/83.0.4103.97 Safari/537.36'
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(final_url, headers=headers) as response:
-                    if response.status == 200:
-                        raw_json = await response.text()
-
-                        try:
-                            raw_text = json.loads(raw_json)
-                        except json.JSONDecodeError:
-                            print(f'{Code_Color.error} An error occurred while loading JSON, possibly a redirection. Check manually.')
-                            return
-
-                        total_users = len(raw_text)
-                        print(f'{Code_Color.ok} {total_users} Users found\n')
-
-                        for user in raw_text:
-                            user_id = user.get('id')
-                            full_name = user.get('name')
-                            username = user.get('slug')
-
-                            print(f'{Code_Color.info} User ID: {user_id}')
-                            print(f'{Code_Color.info} Name: {full_name}')
-                            print(f'{Code_Color.info} Username: {username}')
-                            print(f'{Code_Color.info} {"-" * (10 + len(username))}')
-                    else:
-                        if response.status == 401:
-                            print(f'\n{Code_Color.error} Got 401 Unauthorized')
-                        elif response.status == 403:
-                            print(f'\n{Code_Color.error} Got 403 Forbidden')
-                        elif response.status == 404:
-                            print(f'\n{Code_Color.error} Got 404 Not Found')
-                        elif response.status == 500:
-                            print(f'\n{Code_Color.error} Got 500 Internal Server Error')
-                        else:
-                            print(f'\n{Code_Color.error} Got an unknown status code: {response.status}')
-            except aiohttp.ClientError as e:
-                print(f'{Code_Color.critical} A connection error occurred: {e}')
+        concurrency = self.options.get('user_concurrency', 10)
+        seen = set(self.users)
 
-    async def extract_version(self, response):
-        print(f"{Fore.GREEN}Extracting WordPress version...{Style.RESET_ALL}")
-        match = re.search(r'Version ([0-9]+\.[0-9]+\.?[0-9]*)', response)
-        
-        if match:
-            version = match.group(1)
-            print(f'{Fore.GREEN}WordPress version found: {version}{Style.RESET_ALL}')
-            return version
-        
-        print(f'{Fore.RED}WordPress version not found in the response.{Style.RESET_ALL}')
-        return None
+        def add_users(users):
+            for user in users:
+                user_id = user.get('id')
+                full_name = user.get('name')
+                username = user.get('slug')
+                if username is None or username in seen:
+                    continue
+                seen.add(username)
+                self.users.append(username)
+                self.report('user', f'User ID: {user_id} - Name: {full_name or "unknown"} - Username: {username}', id=user_id, name=full_name, username=username)
 
-    async def crawl_sitemap_for_forms(self, session, processed_urls=None):
-        if processed_urls is None:
-            processed_urls = set()
+        def decode(response):
+            try:
+                users = json.loads(response.body)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                return None
+            return users if isinstance(users, list) else None
 
-        robots_url = f"{self.url}/robots.txt"
-        response = await self.fetch(session, robots_url)
+        # 100 is the largest page the REST API serves; the first page says
+        # how many there are and the rest are fetched together, up to the
+        # same 10000 users the ?author=N fallback stops at.
+        found = len(self.users)
+        response = await self.fetch(f'{final_url}?per_page=100&page=1', accept=None)
+        users = decode(response) if response is not None and response.status == 200 else None
+        if users:
+            add_users(users)
+            try:
+                pages = int(response.headers.get('X-WP-TotalPages', 1))
+            except ValueError:
+                pages = 1
+            if pages > 100:
+                self.log(f'{Code_Color.info} X-WP-TotalPages is {pages}; reading the first 100 pages only')
+                pages = 100
+            results = await bounded_map(lambda page: self.fetch(f'{final_url}?per_page=100&page={page}'), range(2, pages + 1), concurrency)
+            for page, response in results:
+                if response is not None:
+                    add_users(decode(response) or ())
+        elif response is None:
+            self.log(f'{Code_Color.critical} A connection error occurred while fetching {final_url}')
+        elif users is not None:
+            self.log(f'{Code_Color.error} The REST API lists no users')
+        elif response.status == 200:
+            self.log(f'{Code_Color.error} An error occurred while loading JSON, possibly a redirection. Check manually.')
+        elif response.status == 401:
+            self.log(f'\n{Code_Color.error} Got 401 Unauthorized')
+        elif response.status == 403:
+            self.log(f'\n{Code_Color.error} Got 403 Forbidden')
+        elif response.status == 404:
+            self.log(f'\n{Code_Color.error} Got 404 Not Found')
+        elif response.status == 500:
+            self.log(f'\n{Code_Color.error} Got 500 Internal Server Error')
+        else:
+            self.log(f'\n{Code_Color.error} Got an unknown status code: {response.status}')
 
-        if response:
-            sitemap_url = None  
-            lines = response.split('\n')
+        if len(self.users) > found:
+            self.log(f'{Code_Color.ok} {len(self.users)} Users found\n')
+            return
+        self.log(f'{Code_Color.info} Falling back to ?author=N probes')
+        add_users(await self.enum_authors(concurrency))
+        self.log(f'{Code_Color.ok} {len(self.users)} Users found\n')
 
-            for line in lines:
-                if line.strip().startswith('Sitemap:'):
-                    sitemap_url = line.split(':', 1)[1].strip()
-                    break
+    async def author_slug(self, author_id):
+        # /?author=N redirects to /author/<slug>/. Only the Location header
+        # is read: the redirect is not followed and HEAD carries no body.
+        response = await self.fetch(f'{self.url}/?author={author_id}', 2, 'HEAD', accept=(301, 302, 307, 308), allow_redirects=False)
+        if response is None:
+            return None
+        match = AUTHOR_PATH.search(response.headers.get('Location', ''))
+        return match.group(1) if match else None
 
-            if sitemap_url and sitemap_url not in processed_urls:
-                processed_urls.add(sitemap_url)
-                response = await self.fetch(session, sitemap_url)
+    async def enum_authors(self, concurrency=10, max_gap=20, max_id=10000):
+        # Author IDs are probed a window at a time until max_gap IDs in a row
+        # past the last hit have come back empty.
+        users, next_id, last_hit = [], 1, 0
+        while next_id - last_hit <= max_gap and next_id <= max_id:
+            for author_id, slug in await bounded_map(self.author_slug, range(next_id, next_id + concurrency), concurrency):
+                if slug:
+                    users.append({'id': author_id, 'name': None, 'slug': unquote(slug)})
+                    last_hit = author_id
+            next_id += concurrency
+        return users
 
-                if response:
-                    sitemap_xml = etree.fromstring(response.encode('utf-8'))
-                    loc_elements = sitemap_xml.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-                    urls = [loc.text for loc in loc_elements]
+    async def crawl_sitemap_for_forms(self):
+        self.log(f'\nCrawling sitemaps on {self.url} for forms...')
+        forms_with_input = []
 
-                    forms_with_input = []
+        def on_form(url):
+            forms_with_input.append(url)
+            self.report('form', f'Form detected at: {url}', url=url)
 
-                    for sitemap_url in urls:
-                        if sitemap_url not in processed_urls:
-                            processed_urls.add(sitemap_url)
-                            response = await self.fetch(session, sitemap_url)
+        analyzer = self.options.get('analyzer') or HtmlAnalyzer()
+        crawler = SitemapCrawler(self, on_form, analyzer,
+                                 self.options.get('sitemap_max_urls', 10000),
+                                 self.options.get('sitemap_max_depth', 3),
+                                 self.options.get('sitemap_workers', 10))
+        try:
+            await crawler.run()
+        finally:
+            if analyzer is not self.options.get('analyzer'):
+                analyzer.close()
 
-                            if response:
-                                page_soup = BeautifulSoup(response, features='lxml')
-                                forms = page_soup.find_all('form')
+        if not crawler.seen:
+            self.log(f'No sitemap found for {self.url}.', color=Fore.RED)
+        self.log(f'Crawled {crawler.pages} pages, {len(forms_with_input)} with forms.')
+        return forms_with_input
 
-                                for form in forms:
-                                    if form.find('input', {'type': 'text'}):
-                                        forms_with_input.append(sitemap_url)
-                                        print(f'{Fore.GREEN}Form detected at: {sitemap_url}{Style.RESET_ALL}')
-                                        break  
+    def passive_plugins(self):
+        # Plugin slugs (and ?ver= hints) referenced by any page already fetched.
+        found = {}
+        for response in self.responses.values():
+            if not response.body:
+                continue
+            for match in PLUGIN_PATH.finditer(response.body):
+                slug = match.group(1).decode()
+                version = match.group(2).decode() if match.group(2) else None
+                if found.get(slug) is None:
+                    found[slug] = version
+        return found
 
-                    for sitemap_url in urls:
-                        if sitemap_url.endswith('.xml'):
-                            nested_forms = await self.crawl_sitemap_for_forms(session, processed_urls)
-                            forms_with_input.extend(nested_forms)
+    def report_vulnerabilities(self, kind, slug, version):
+        index = self.options.get('vulns')
+        if index is None:
+            return []
+        vulnerabilities = index.lookup(kind, slug, version)
+        for ref, title, cve, cvss in vulnerabilities:
+            self.report('vulnerability', f'{slug} {version} is vulnerable: {title} ({cve or ref}, CVSS {cvss if cvss is not None else "n/a"})',
+                        'critical', software=kind, slug=slug, version=version, ref=ref, title=title, cve=cve, cvss=cvss)
+        return vulnerabilities
 
-                    return forms_with_input
-                else:
-                    print(f'{Fore.RED}Failed to fetch sitemap URL: {sitemap_url}{Style.RESET_ALL}')
-            else:
-                print(f'{Fore.YELLOW}Sitemap URL {sitemap_url} has already been processed or is not found.{Style.RESET_ALL}')
-        else:
-            print(f'{Fore.RED}Failed to fetch robots.txt from: {robots_url}{Style.RESET_ALL}')
+    async def probe_plugin(self, slug, database):
+        # One request per slug: readme.txt tells both whether the plugin is
+        # there and its version. The main file is only tried when the readme
+        # is forbidden, so a miss never costs a second request.
+        base = f'{self.url}/wp-content/plugins/{slug}/'
+        response = await self.fetch(base + 'readme.txt', retries=2, accept=(200, 403), patterns={'stable': STABLE_TAG}, until_match=True,
+                                    limit=8192, cache=False)
+        if response is None:
+            return None
+        if response.status == 200:
+            if await self.is_soft_404(response):
+                return None
+            match = response.matches['stable']
+            return match.group(1).decode() if match else ''
 
-        return []
+        main_file = database.main_file(slug)
+        if main_file and await self.probe(base + main_file, retries=2):
+            return ''
+        return None
 
-    async def check_plugins(self, session):
-        print(f'{Fore.GREEN}\nChecking installed plugins on {self.url}...{Style.RESET_ALL}')
+    async def check_plugins(self):
+        self.log(f'\nChecking installed plugins on {self.url}...')
         
         plugin_directory_url = f'{self.url}/wp-content/plugins/'
         rest_api_plugins_url = f'{self.url}/wp-json/plugins/v1/all'
-        
-        known_plugins = [
-            'wordpress-seo/wp-seo.php',                  # Yoast SEO
-            'akismet/akismet.php',                        # Akismet
-            'woocommerce/woocommerce.php',                # WooCommerce
-            'elementor/elementor.php',                    # Elementor Page Builder
-            'wpforms-lite/wpforms.php',                   # WPForms
-            'contact-form-7/wp-contact-form-7.php',      # Contact Form 7
-            'jetpack/jetpack.php',                        # Jetpack
-            'wp-super-cache/wp-cache.php',                # WP Super Cache
-            'wp-rocket/wp-rocket.php',                    # WP Rocket
-            'gravityforms/gravityforms.php',             # Gravity Forms
-            'bbpress/bbpress.php',                        # bbPress
-            'wpml-multilingual-cms/wpml.php',            # WPML
-            'nextgen-gallery/nggallery.php',              # NextGEN Gallery
-            'wordfence/wordfence.php',                    # Wordfence Security
-            'duplicate-post/duplicate-post.php',          # Duplicate Post
-            'updraftplus/updraftplus.php',                # UpdraftPlus
-            'redirection/redirection.php',                # Redirection
-            'all-in-one-seo-pack/all_in_one_seo_pack.php',  # All in One SEO Pack
-            'mailchimp-for-wp/mailchimp-for-wp.php',     # Mailchimp for WordPress
-            'social-warfare/social-warfare.php',          # Social Warfare
-            'wp-optimize/wp-optimize.php',                # WP-Optimize
-            'monsterinsights/google-analytics-for-wordpress.php',  # MonsterInsights
-            'schema-and-structured-data-for-wp/schema-and-structured-data-for-wp.php',  # Schema & Structured Data for WP
-            'wp-job-manager/wp-job-manager.php',          # WP Job Manager
-            'wp-user-frontend/wp-user-frontend.php',      # WP User Frontend
-            'redirection/redirection.php',                # Redirection
-            'smush/wp-smush.php',                         # Smush Image Compression
-            'duplicator/duplicator.php',                  # Duplicator
-            'wp-cli/faq',                                # WP-CLI
-            'livechat/livechat.php',                      # LiveChat
-            'tablepress/tablepress.php',                  # TablePress
-            'wp-smtp/wp-smtp.php',                        # WP Mail SMTP
-            'wp-customer-reviews/wp-customer-reviews.php', # WP Customer Reviews
-            'login-lockdown/login-lockdown.php',          # Login LockDown
-            'insert-headers-and-footers/insert-headers-and-footers.php', # Insert Headers and Footers
-            'schema-woocommerce/schema-woocommerce.php',  # Schema & Structured Data for WooCommerce
-            'wp-maintenance-mode/wp-maintenance-mode.php', # WP Maintenance Mode
-            'shortcodes-ultimate/shortcodes-ultimate.php', # Shortcodes Ultimate
-            'google-site-kit/google-site-kit.php',        # Site Kit by Google
-            'elementor-pro/elementor.php',                # Elementor Pro
-            'memberpress/memberpress.php',                # MemberPress
-            'wp-ultimate-recipe/wp-ultimate-recipe.php', # WP Ultimate Recipe
-            'popup-maker/popup-maker.php',                # Popup Maker
-            'advanced-custom-fields/acf.php',            # Advanced Custom Fields
-            'nextgen-gallery/nggallery.php',              # NextGEN Gallery
-            'wp-testimonial/wordpress-testimonial.php',  # WP Testimonials
-        ]
+        database = PluginDatabase.load(self.options.get('plugin_list'))
 
-        response = await self.fetch(session, plugin_directory_url)
+        response = await self.fetch(plugin_directory_url)
         if response:
-            print(f'Successfully fetched plugin directory, status: {response.status}')
-            try:
-                response_text = await response.text()
-                if 'Index of' in response_text:
-                    print(f'{Fore.GREEN}Plugin directory listing found at: {plugin_directory_url}{Style.RESET_ALL}')
-            except Exception as e:
-                print(f'{Fore.RED}Error reading plugin directory response: {e}{Style.RESET_ALL}')
+            self.log(f'Successfully fetched plugin directory, status: {response.status}', color='')
+            if response.match({'index': INDEX_OF})['index']:
+                self.report('directory-listing', f'Plugin directory listing found at: {plugin_directory_url}', url=plugin_directory_url)
 
-        response = await self.fetch(session, rest_api_plugins_url)
+        response = await self.fetch(rest_api_plugins_url)
         if response:
-            print(f'Successfully fetched REST API plugins, status: {response.status}')
+            self.log(f'Successfully fetched REST API plugins, status: {response.status}', color='')
             try:
-                response_text = await response.text()
-                plugins = json.loads(response_text)
-
-                print(f'{Fore.GREEN}Installed Plugins from REST API:{Style.RESET_ALL}')
-                installed_plugins = [plugin["slug"] + '/' + plugin["file"] for plugin in plugins]
-                
-                for plugin in installed_plugins:
-                    if plugin in known_plugins:
-                        print(f'{Fore.GREEN}{plugin} - Version: {next(p["version"] for p in plugins if (p["slug"] + "/" + p["file"]) == plugin)}{Style.RESET_ALL}')
-                    else:
-                        print(f'{Fore.YELLOW}{plugin} - Version: {next(p["version"] for p in plugins if (p["slug"] + "/" + p["file"]) == plugin)} (Unknown plugin){Style.RESET_ALL}')
-            except json.JSONDecodeError:
-                print(f'{Fore.RED}Failed to decode JSON response from the REST API.{Style.RESET_ALL}')
+                for plugin in json.loads(await response.text()):
+                    self.plugins[plugin['slug']] = plugin.get('version')
+            except (json.JSONDecodeError, TypeError, KeyError):
+                self.log('Failed to decode JSON response from the REST API.', color=Fore.RED)
+
+        fingerprint = await self.passive_fingerprint()
+        for slug, version in fingerprint.plugins.items():
+            if self.plugins.get(slug) is None:
+                self.plugins[slug] = version
+        for slug, version in self.passive_plugins().items():
+            if self.plugins.get(slug) is None:
+                self.plugins[slug] = version
+
+        if self.options.get('plugin_mode') == 'aggressive':
+            candidates = (slug for slug in database if slug not in self.plugins)
+            # The per-host rate, not concurrency, bounds this: one request per slug.
+            self.log(f'Probing up to {len(database)} plugin slugs, at least {len(database) / self.transport.rate:.0f}s at {self.transport.rate:g} requests/s...')
+            results = await bounded_map(lambda slug: self.probe_plugin(slug, database), candidates,
+                                        self.options.get('plugin_concurrency', 50))
+            for slug, version in results:
+                if version is not None:
+                    self.plugins[slug] = version or None
 
-    async def check_themes(self, session):
-        print(f'{Fore.GREEN}\nChecking installed themes on {self.url}...{Style.RESET_ALL}')
+        if not self.plugins:
+            self.log('No plugins detected.', color=Fore.RED)
+        for slug, version in sorted(self.plugins.items()):
+            if slug in database:
+                self.report('plugin', f'{slug} - Version: {version or "unknown"}', slug=slug, version=version, known=True)
+            else:
+                self.report('plugin', f'{slug} - Version: {version or "unknown"} (Unknown plugin)', 'info', slug=slug, version=version, known=False)
+            self.report_vulnerabilities('plugin', slug, version)
+
+    async def check_themes(self):
+        self.log(f'\nChecking installed themes on {self.url}...')
 
         theme_directory_url = f'{self.url}/wp-content/themes/'
         rest_api_themes_url = f'{self.url}/wp-json/wp/v2/themes'
@@ -495,67 +2312,458 @@ class AsyncWordPressScanner:
             'magazine',                  # Magazine
         ]
 
-        response = await self.fetch(session, theme_directory_url)
-        if response:
-            print(f'Successfully fetched theme directory, status: {response.status}')
+        # The homepage already names the active theme by its stylesheet slug;
+        # the directory and the REST API are only asked when it does not.
+        fingerprint = await self.passive_fingerprint()
+        for theme, version in fingerprint.themes.items():
+            if self.themes.get(theme) is None:
+                self.themes[theme] = version
+
+        if fingerprint.themes:
+            self.log(f'Themes taken from the homepage: {", ".join(fingerprint.themes)}', color='')
+        else:
+            response = await self.fetch(theme_directory_url)
+            if response:
+                self.log(f'Successfully fetched theme directory, status: {response.status}', color='')
+                if response.match({'index': INDEX_OF})['index']:
+                    self.report('directory-listing', f'Theme directory listing found at: {theme_directory_url}', url=theme_directory_url)
+
+            response = await self.fetch(rest_api_themes_url)
+            if response:
+                self.log(f'Successfully fetched REST API themes, status: {response.status}', color='')
+                try:
+                    for theme in json.loads(await response.text()):
+                        self.themes[theme.get('stylesheet') or theme['name']] = theme.get('version')
+                except (json.JSONDecodeError, TypeError, KeyError):
+                    self.log('Failed to decode JSON response from the REST API.', color=Fore.RED)
+
+        known_themes = set(known_themes)
+        for theme, version in self.themes.items():
+            if theme in known_themes:
+                self.report('theme', f'{theme} - Version: {version or "unknown"}', slug=theme, version=version, known=True)
+            else:
+                self.report('theme', f'{theme} - Version: {version or "unknown"} (Unknown theme)', 'info', slug=theme, version=version, known=False)
+            self.report_vulnerabilities('theme', theme, version)
+
+    async def scan(self, checks):
+        if self.transport is None:
+            async with Transport() as self.transport:
+                return await self.scan(checks)
+
+        if self.jobs is not None:
+            # Replay what an earlier run already found and only run the rest.
+            done, findings = await self.jobs.completed(self.url)
+            for finding in findings:
+                self.reporter.emit(finding)
+            self.replayed = done
+            checks = [check for check in checks if check not in done]
+
+        gate = self.options.get('gate', True)
+
+        async def run_check(check):
+            CURRENT_CHECK.set(check.name)
+            for need in check.needs if gate else ():
+                if not await self.artifact(need):
+                    # A gate that failed on errors is inconclusive: leave the
+                    # check pending for a resumed run instead of marking it done.
+                    if need in self.errors:
+                        self.errors[check.name] = f'{need} gate failed: {self.errors[need]}'
+                    self.log(f'Skipping {check.name} on {self.url}: {need} gate not passed.', color=Fore.YELLOW)
+                    if self.jobs is not None:
+                        self.checkpoint(check.name)
+                    return None
+            profiler = self.transport.profiler
+            start = time.perf_counter()
             try:
-                response_text = await response.text()
-                if 'Index of' in response_text:
-                    print(f'{Fore.GREEN}Theme directory listing found at: {theme_directory_url}{Style.RESET_ALL}')
+                result = await getattr(self, check.method)()
             except Exception as e:
-                print(f'{Fore.RED}Error reading theme directory response: {e}{Style.RESET_ALL}')
+                if self.jobs is not None:
+                    self.jobs.failed(self.url, check.name, f'{type(e).__name__}: {e}')
+                raise
+            finally:
+                if profiler is not None:
+                    profiler.check_done(self.url, check.name, start)
+            if self.jobs is not None:
+                self.checkpoint(check.name)
+            return result
 
-        response = await self.fetch(session, rest_api_themes_url)
-        if response:
-            print(f'Successfully fetched REST API themes, status: {response.status}')
+        # Cheap checks run first, together; they usually settle the gates, so
+        # the wordlist tier never starts on hosts it does not apply to.
+        selected = [CHECKS[check] for check in checks if check in CHECKS]
+        for tier in sorted({check.tier for check in selected}):
+            await asyncio.gather(*(run_check(check) for check in selected if check.tier == tier))
+        if self.jobs is not None:
+            for name in self.artifacts:
+                if name not in checks and name not in self.replayed:
+                    self.checkpoint(name)
+
+    def checkpoint(self, check):
+        if check in self.errors:
+            self.jobs.failed(self.url, check, self.errors[check])
+        else:
+            self.jobs.done(self.url, check)
+
+class FleetScanner:
+    # Streams targets from a file (or stdin) through a fixed pool of workers
+    # that share one event loop and one Transport.
+
+    def __init__(self, targets, user_agent, checks, transport, max_targets=50, **options):
+        self.targets = targets
+        self.options = options
+        self.user_agent = user_agent
+        self.checks = checks
+        self.transport = transport
+        self.max_targets = max_targets
+        self.done = 0
+        self.failed = 0
+
+    @staticmethod
+    def normalize(target):
+        target = target.strip()
+        if not target or target.startswith('#'):
+            return None
+        if '://' not in target:
+            target = 'http://' + target
+        return target.rstrip('/')
+
+    async def read_targets(self):
+        loop = asyncio.get_running_loop()
+        stream = sys.stdin if self.targets == '-' else open(self.targets, encoding='utf-8', errors='replace')
+        try:
+            while True:
+                line = await loop.run_in_executor(None, stream.readline)
+                if not line:
+                    break
+                target = self.normalize(line)
+                if target:
+                    yield target
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+    async def worker(self, queue):
+        while True:
+            target = await queue.get()
+            if target is None:
+                return
+            scanner = AsyncWordPressScanner(target, self.user_agent, self.transport, **self.options)
+            failed = False
             try:
-                response_text = await response.text()
-                themes = json.loads(response_text)
+                await scanner.scan(self.checks)
+            except Exception as e:
+                self.failed += 1
+                failed = True
+                scanner.report('error', f'Scan of {target} failed: {e}', 'error', error=str(e))
+            finally:
+                self.done += 1
+                self.finished(scanner, target, failed)
 
-                print(f'{Fore.GREEN}Installed Themes from REST API:{Style.RESET_ALL}')
-                installed_themes = [theme["name"] for theme in themes]
+    def finished(self, scanner, target, failed):
+        scanner.log(f'{Code_Color.info} [{self.done}] Finished {target}', color='')
 
-                for theme in installed_themes:
-                    if theme in known_themes:
-                        print(f'{Fore.GREEN}{theme} - Version: {next(t["version"] for t in themes if t["name"] == theme)}{Style.RESET_ALL}')
-                    else:
-                        print(f'{Fore.YELLOW}{theme} - Version: {next(t["version"] for t in themes if t["name"] == theme)} (Unknown theme){Style.RESET_ALL}')
-            except json.JSONDecodeError:
-                print(f'{Fore.RED}Failed to decode JSON response from the REST API.{Style.RESET_ALL}')
+    async def run(self):
+        queue = asyncio.Queue(maxsize=self.max_targets)
+        async with self.transport:
+            workers = [asyncio.create_task(self.worker(queue)) for _ in range(self.max_targets)]
+            try:
+                async for target in self.read_targets():
+                    await queue.put(target)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
 
-    async def scan(self, checks):
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-
-            check_methods = {
-                'wordpress': self.check_wordpress,
-                'readme': self.check_readme,
-                'debug-log': self.check_debug_log,
-                'backup-file': self.check_backup_file,
-                'directory-listing': self.check_directory_listing,
-                'xml-rpc': self.is_xml_rpc,
-                'robots-text': self.check_robots_text,
-                'full-path-disclosure': self.check_full_path_disclosure,
-                'enum-users': self.enum_wordpress_users,
-                'sitemap-forms': self.crawl_sitemap_for_forms,
-                'check-plugins': self.check_plugins,
-                'check-themes': self.check_themes,
-            }
-
-            for check in checks:
-                if check in check_methods:
-                    tasks.append(check_methods[check](session))
-
-            await asyncio.gather(*tasks)
+        console = (self.options.get('reporter') or Reporter(console=ConsoleSink())).console
+        if console is not None:
+            console.log(f'{Code_Color.ok} Fleet scan complete: {self.done} targets, {self.failed} failed', '')
+
+class QueueSink(BufferedSink):
+    # Ships a shard's findings to the parent process in batches. Progress
+    # markers go through the same writer thread, so they arrive after the
+    # findings of their target.
+
+    def __init__(self, queue, batch_size=64):
+        super().__init__(batch_size)
+        self.queue = queue
+
+    def encode(self, finding):
+        return (finding.target, finding.check, finding.kind, finding.severity, finding.message, finding.data)
+
+    def write(self, batch):
+        self.queue.put(('findings', batch))
+
+    def finished(self, target, failed):
+        self.flush()
+        self.pending.append(self.writer.submit(self.queue.put, ('finished', target, failed)))
+
+    def finish(self):
+        pass
+
+class ShardFleetScanner(FleetScanner):
+    # The FleetScanner of one shard process: targets come from the parent's
+    # queue and progress goes back through the QueueSink.
+
+    def __init__(self, inbox, sink, user_agent, checks, transport, max_targets=50, **options):
+        super().__init__(None, user_agent, checks, transport, max_targets, **options)
+        self.inbox = inbox
+        self.sink = sink
+
+    async def read_targets(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            target = await loop.run_in_executor(None, self.inbox.get)
+            if target is None:
+                break
+            yield target
+
+    def finished(self, scanner, target, failed):
+        self.sink.finished(target, failed)
+
+class Runtime:
+    # Everything one scanning process owns: the transport, the stores and the
+    # HTML analyzer. A sharded fleet builds one per process and divides the
+    # global limits between them; per-host limits stay whole because a host
+    # only ever lives in one shard.
+
+    def __init__(self, args, reporter, shards=1):
+        def share(total):
+            return max(1, -(-total // shards))
+
+        self.jobs = JobStore(args.resume) if args.resume else None
+        # Shards share one cache file whose size is accounted in the file itself.
+        self.http_cache = HttpCache(args.http_cache, args.http_cache_size << 20, args.max_body) if args.http_cache else None
+        self.analyzer = HtmlAnalyzer(args.html_workers or (share(os.cpu_count() or 1) if shards > 1 else None))
+        self.options = dict(sitemap_max_urls=args.sitemap_max_urls, sitemap_max_depth=args.sitemap_max_depth, sitemap_workers=args.sitemap_workers,
+                            listing_max_depth=args.listing_max_depth, listing_max_entries=args.listing_max_entries,
+                            listing_workers=args.listing_workers, listing_rate=args.listing_rate,
+                            plugin_mode=args.plugin_mode, plugin_list=args.plugin_list, plugin_concurrency=args.plugin_concurrency,
+                            user_concurrency=args.user_concurrency, gate=not args.no_gate,
+                            vulns=VulnerabilityIndex(args.vuln_db) if args.vuln_db else None,
+                            fingerprints=HashIndex.load(args.fingerprint_db) if args.fingerprint_db else None,
+                            fingerprint_max_requests=args.fingerprint_max_requests, analyzer=self.analyzer, reporter=reporter,
+                            jobs=self.jobs, http_cache=self.http_cache)
+        self.transport = Transport(RequestLimiter(share(args.concurrency), args.per_host), share(args.pool_size), args.pool_per_host,
+                                   args.keepalive, args.dns_ttl, args.timeout, args.rate, args.breaker_threshold, args.breaker_cooldown,
+                                   args.max_backoff, args.max_body, Profiler() if args.profile else None)
+        self.max_targets = share(args.max_targets)
+
+    def close(self, profile=None):
+        self.analyzer.close()
+        if self.jobs is not None:
+            self.jobs.close()
+        if self.http_cache is not None:
+            self.http_cache.close()
+        if self.transport.profiler is not None and profile:
+            self.transport.profiler.export(profile)
+
+def run_loop(main):
+    # Event loop entry point; uvloop is used when it is installed.
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(main)
+
+def run_shard(args, checks, index, shards, inbox, results):
+    sink = QueueSink(results)
+    runtime = Runtime(args, Reporter([sink]), shards)
+    fleet = ShardFleetScanner(inbox, sink, args.user_agent, checks, runtime.transport, runtime.max_targets, **runtime.options)
+    try:
+        run_loop(fleet.run())
+    finally:
+        runtime.close()
+        sink.close()
+        # The parent merges every shard's profile into one report.
+        if runtime.transport.profiler is not None:
+            results.put(('profile', runtime.transport.profiler))
+        results.put(('exit', index))
+
+class ShardedFleet:
+    # Splits the target stream across worker processes, each with its own
+    # event loop and Runtime. Targets are routed by host so every request to
+    # a host goes through one process and its per-host limits, rate and
+    # breaker stay exact. The parent only reads targets and merges results.
+
+    def __init__(self, args, checks, reporter, processes):
+        self.args = args
+        self.checks = checks
+        self.reporter = reporter
+        self.processes = processes
+        self.done = 0
+        self.failed = 0
+        self.stopped = threading.Event()
+        self.profiler = Profiler() if args.profile else None
+
+    def shard_of(self, target):
+        return zlib.crc32(urlsplit(target).netloc.encode()) % self.processes
+
+    def feed(self, inboxes):
+        def put(inbox, item):
+            while not self.stopped.is_set():
+                try:
+                    inbox.put(item, timeout=1)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        stream = sys.stdin if self.args.targets == '-' else open(self.args.targets, encoding='utf-8', errors='replace')
+        try:
+            for line in stream:
+                target = FleetScanner.normalize(line)
+                if target and not put(inboxes[self.shard_of(target)], target):
+                    return
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            for inbox in inboxes:
+                put(inbox, None)
+
+    def run(self):
+        console = self.reporter.console
+        inboxes = [multiprocessing.Queue(maxsize=self.args.max_targets) for _ in range(self.processes)]
+        results = multiprocessing.Queue()
+        shards = [multiprocessing.Process(target=run_shard, args=(self.args, self.checks, index, self.processes, inboxes[index], results))
+                  for index in range(self.processes)]
+        for shard in shards:
+            shard.start()
+        feeder = threading.Thread(target=self.feed, args=(inboxes,), daemon=True)
+        feeder.start()
+
+        running = set(range(self.processes))
+        try:
+            while running:
+                try:
+                    message = results.get(timeout=1)
+                except Empty:
+                    dead = [index for index in running if shards[index].exitcode not in (None, 0)]
+                    if dead:
+                        raise RuntimeError(f'shard {dead[0]} exited with code {shards[dead[0]].exitcode}')
+                    continue
+                if message[0] == 'findings':
+                    for row in message[1]:
+                        self.reporter.emit(Finding(*row))
+                elif message[0] == 'finished':
+                    self.done += 1
+                    self.failed += message[2]
+                    if console is not None:
+                        console.log(f'{Code_Color.info} [{self.done}] Finished {message[1]}', '')
+                elif message[0] == 'profile':
+                    self.profiler.merge(message[1])
+                elif message[0] == 'exit':
+                    running.discard(message[1])
+        finally:
+            self.stopped.set()
+            for shard in shards:
+                if running:
+                    shard.terminate()
+                shard.join()
+
+        if console is not None:
+            console.log(f'{Code_Color.ok} Fleet scan complete: {self.done} targets, {self.failed} failed, on {self.processes} processes', '')
+        if self.profiler is not None:
+            self.profiler.export(self.args.profile)
+
+def positive_float(value):
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f'must be greater than 0, got {value}')
+    return number
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='WordPress Scanner')
-    parser.add_argument('url', help='The URL of the WordPress site to scan')
+    parser.add_argument('url', nargs='?', help='The URL of the WordPress site to scan')
+    parser.add_argument('--targets', help='File with one target URL per line ("-" reads stdin); enables fleet mode')
     parser.add_argument('--user-agent', default='Wordpresscan - For educational purpose only!', help='User agent to use')
-    parser.add_argument('--checks', default='wordpress', help='Comma-separated list of checks to perform: wordpress, readme, debug-log, backup-file, directory-listing, xml-rpc, robots-text, full-path-disclosure, enum-users, sitemap-forms, check-plugins, check-themes')
+    parser.add_argument('--checks', default='wordpress', help='Comma-separated list of checks to perform: wordpress, readme, debug-log, backup-file, directory-listing, listing-inventory, xml-rpc, robots-text, full-path-disclosure, enum-users, sitemap-forms, check-plugins, check-themes, core-version')
+    parser.add_argument('--concurrency', type=int, default=100, help='Maximum requests in flight across all targets')
+    parser.add_argument('--per-host', type=int, default=6, help='Maximum requests in flight per host')
+    parser.add_argument('--processes', type=int, default=1, help='Worker processes for a --targets fleet, each with its own event loop (0: one per core)')
+    parser.add_argument('--max-targets', type=int, default=50, help='Maximum targets scanned at the same time in fleet mode')
+    parser.add_argument('--pool-size', type=int, default=100, help='Maximum open connections in the shared pool')
+    parser.add_argument('--pool-per-host', type=int, default=6, help='Maximum open connections per host in the shared pool')
+    parser.add_argument('--keepalive', type=float, default=30, help='Seconds an idle connection is kept for reuse')
+    parser.add_argument('--dns-ttl', type=int, default=300, help='Seconds resolved addresses are cached')
+    parser.add_argument('--timeout', type=float, default=20, help='Total timeout of a single request in seconds')
+    parser.add_argument('--rate', type=positive_float, default=20, help='Starting and maximum requests per second per host; halved when a host answers 429/503')
+    parser.add_argument('--max-backoff', type=float, default=30, help='Longest retry delay in seconds; a longer Retry-After gives the URL up')
+    parser.add_argument('--max-body', type=int, default=1 << 20, help='Maximum bytes read from a single response body; longer bodies are truncated')
+    parser.add_argument('--breaker-threshold', type=int, default=5, help='Consecutive connect failures or timeouts before a host is skipped')
+    parser.add_argument('--breaker-cooldown', type=float, default=60, help='Seconds a failing host is skipped before it is tried again')
+    parser.add_argument('--sitemap-max-urls', type=int, default=10000, help='Maximum pages visited by the sitemap crawler')
+    parser.add_argument('--sitemap-max-depth', type=int, default=3, help='Maximum nesting of sitemap indexes followed')
+    parser.add_argument('--sitemap-workers', type=int, default=10, help='Concurrent fetches of the sitemap crawler')
+    parser.add_argument('--listing-max-depth', type=int, default=5, help='Directory levels listing-inventory walks below an open listing')
+    parser.add_argument('--listing-max-entries', type=int, default=100000, help='Maximum listing entries inventoried per target')
+    parser.add_argument('--listing-workers', type=int, default=5, help='Concurrent listing fetches per target')
+    parser.add_argument('--listing-rate', type=float, default=10, help='Maximum listing fetches per second per target')
+    parser.add_argument('--plugin-mode', choices=['passive', 'aggressive'], default='passive', help='passive only reads pages already fetched; aggressive also probes every slug in the plugin list, '
+                        'one request per slug, so a list of N slugs takes at least N / --rate seconds per host')
+    parser.add_argument('--plugin-list', help='Plugin slug database, one slug/main-file.php per line (default: data/plugins.txt)')
+    parser.add_argument('--plugin-concurrency', type=int, default=50, help='Concurrent slug probes in aggressive plugin mode')
+    parser.add_argument('--user-concurrency', type=int, default=10, help='Concurrent REST pages or ?author=N probes when enumerating users')
+    parser.add_argument('--vuln-db', help='Offline vulnerability index built with --import-vulns')
+    parser.add_argument('--import-vulns', metavar='FEED', help='Compile a vulnerability feed (JSON or JSON Lines) into --vuln-db and exit')
+    parser.add_argument('--fingerprint-db', help='Static file hash index of WordPress releases (built with --build-fingerprints)')
+    parser.add_argument('--build-fingerprints', metavar='RELEASES', help='Hash the static files of every release archive or directory in RELEASES into --fingerprint-db and exit')
+    parser.add_argument('--fingerprint-max-requests', type=int, default=15, help='Maximum static files fetched to pin the core version')
+    parser.add_argument('--html-workers', type=int, default=None, help='Processes used for HTML analysis (default: one per core)')
+    parser.add_argument('--output', help='Append findings as JSON Lines to this file ("-" writes stdout and moves console output to stderr)')
+    parser.add_argument('--sqlite', help='Append findings to a findings table in this SQLite database')
+    parser.add_argument('--quiet', action='store_true', help='No console output; findings only go to --output/--sqlite')
+    parser.add_argument('--no-gate', action='store_true', help='Run every requested check even when the site does not look like WordPress')
+    parser.add_argument('--resume', metavar='DB', help='Checkpoint finished (target, check) pairs and their findings in this SQLite file; '
+                        'a rerun with the same file skips them and retries only failed or pending ones. Checkpointed findings are '
+                        'replayed, so --output and --sqlite are rewritten rather than appended to')
+    parser.add_argument('--http-cache', metavar='DB', help='Keep response bodies and ETag/Last-Modified in this SQLite file and revalidate them on later runs')
+    parser.add_argument('--http-cache-size', type=int, default=256, help='Maximum megabytes of bodies kept in --http-cache')
+    parser.add_argument('--profile', nargs='?', const='wpscan-profile', metavar='PREFIX',
+                        help='Time every request and check; prints a summary and writes PREFIX.prom and PREFIX.trace.json (default prefix: wpscan-profile)')
 
     args = parser.parse_args()
     checks = args.checks.split(',')
 
-    scanner = AsyncWordPressScanner(args.url, args.user_agent)
-    asyncio.run(scanner.scan(checks))
+    if args.import_vulns:
+        if not args.vuln_db:
+            parser.error('--import-vulns requires --vuln-db')
+        count = VulnerabilityIndex.build(args.import_vulns, args.vuln_db)
+        print(f'{Code_Color.ok} Imported {count} vulnerabilities into {args.vuln_db}')
+        sys.exit(0)
+
+    if args.build_fingerprints:
+        if not args.fingerprint_db:
+            parser.error('--build-fingerprints requires --fingerprint-db')
+        versions, files = HashIndex.build(args.build_fingerprints, args.fingerprint_db)
+        print(f'{Code_Color.ok} Indexed {files} distinguishing files across {versions} releases into {args.fingerprint_db}')
+        sys.exit(0)
+
+    if not args.targets and not args.url:
+        parser.error('either a url or --targets is required')
+
+    # A resumed run replays every checkpointed finding, so its sinks start
+    # empty instead of appending a second copy.
+    sinks = []
+    if args.output:
+        sinks.append(JsonLinesSink(args.output, append=not args.resume))
+    if args.sqlite:
+        sinks.append(SQLiteSink(args.sqlite, append=not args.resume))
+    reporter = Reporter(sinks, None if args.quiet else ConsoleSink(sys.stderr if args.output == '-' else sys.stdout))
+
+    processes = args.processes or os.cpu_count() or 1
+    try:
+        if args.targets and processes > 1:
+            ShardedFleet(args, checks, reporter, processes).run()
+        else:
+            runtime = Runtime(args, reporter)
+            try:
+                if args.targets:
+                    run_loop(FleetScanner(args.targets, args.user_agent, checks, runtime.transport, runtime.max_targets, **runtime.options).run())
+                else:
+                    async def scan_one():
+                        async with runtime.transport:
+                            await AsyncWordPressScanner(args.url, args.user_agent, runtime.transport, **runtime.options).scan(checks)
+                    run_loop(scan_one())
+            finally:
+                runtime.close(args.profile)
+    finally:
+        reporter.close()